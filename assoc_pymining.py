@@ -5,97 +5,260 @@
 import sys
 import os
 import argparse
+import logging
+import time
 from pymining import itemmining, assocrules, seqmining
 import rmdb
 import matplotlib.pyplot as plt
 
+logger = logging.getLogger('assoc_pymining')
+
 class Assoc_Learner:
   def __init__(self, min_support = 0.3, min_confidence = 0.5, 
-      min_lift = 1.2):
+      min_lift = 1.2, workers = None):
     self.min_support = min_support
     self.min_confidence = min_confidence
     self.min_lift = min_lift
+    # generate rules in this many processes if set
+    self.workers = workers
+
+  def log_phase(self, phase, started, stats = None):
+    ''' log the time spent in a phase since started, and what the miner did
+    during the phase if stats (a pymining MiningStats) is given. '''
+    logger.info("%s took %.3fs", phase, time.time() - started)
+    if stats is not None:
+      logger.info("%s: %s", phase, stats)
+      for item, seconds in stats.slowest_items(3):
+        logger.debug("%s: item %s took %.3fs", phase, item, seconds)
+
+  def mine_seqs(self, baskets, closed = False, times = None, max_gap = None,
+      max_window = None, max_length = None, engine = 'pseudo'):
+    ''' engine is 'pseudo' (pseudo-projection) or 'bitmap' (SPAM bitmaps,
+    seqmining.freq_seq_bitmap). bitmap is faster on dense baskets, where most
+    tokens stay in every projection, but much slower on sparse ones, and its
+    bitmaps span all the baskets at each level of the search: keep pseudo
+    unless a benchmark on the data says otherwise. bitmap runs in one process.
+    closed, max_gap, max_window and max_length use their own engine.
+
+    closed only mines the closed sequences (BIDE), which skips the
+    sequences nonmax suppression would drop anyway. Their sub-sequences are
+    not mined, so seqmining.get_lifts counts the supports of the parts that
+    aren't closed: a sequence gets the same lift as without closed.
 
-  def mine_seqs(self, baskets):
-    print "mining frequent sequences"
-    freq_seqs = seqmining.freq_seq_enum(baskets, len(baskets) * self.min_support)
-    print "found {} frequent sequences".format(len(freq_seqs))
+    max_gap and max_window (in the unit of times, e.g. from
+    db.query(timed = True), or positions without times) only count the
+    sequences happening close enough in time: "failed A, then succeeded B
+    within 10 minutes" is max_window = 600. The supports of the parts of a
+    timed sequence are counted under the same constraints as its own. '''
+    logger.info("mining frequent sequences")
+    started = time.time()
+    timed = max_gap is not None or max_window is not None
+    if timed or max_length is not None:
+      freq_seqs, stats = seqmining.freq_seq_enum(baskets,
+          len(baskets) * self.min_support, max_length = max_length,
+          pseudo = True, closed = closed, stats = True, workers = self.workers,
+          times = times, max_gap = max_gap, max_window = max_window)
+    elif closed:
+      freq_seqs, stats = seqmining.freq_seq_enum(baskets,
+          len(baskets) * self.min_support, closed = True, stats = True,
+          workers = self.workers)
+    elif engine == 'bitmap':
+      freq_seqs, stats = seqmining.freq_seq_bitmap(baskets,
+          len(baskets) * self.min_support, stats = True)
+    elif engine == 'pseudo':
+      freq_seqs, stats = seqmining.freq_seq_enum(baskets,
+          len(baskets) * self.min_support, pseudo = True, stats = True,
+          workers = self.workers)
+    else:
+      raise ValueError("Unknown sequence engine: {}".format(engine))
+    self.log_phase("sequence mining", started, stats)
+    logger.info("found %d frequent sequences", len(freq_seqs))
 
-    total = len(baskets)
-    seq_supports = {frozenset(x[0]) : float(x[1])/total for x in freq_seqs}
+    started = time.time()
     out_seqs = []
     # test the lift of each rule
-    for seq in freq_seqs:
-      seq_key = frozenset(seq[0])
-      if len(seq_key) < 2:
-        continue
-      sup_total = seq_supports[seq_key]
-      sup_split_max = 0
-      for token in seq_key:
-        token_set = frozenset((token,))
-        sup_token = seq_supports[token_set]
-        sup_rest = seq_supports[seq_key-token_set]
-
-        if sup_token*sup_rest > sup_split_max:
-          sup_split_max = sup_token*sup_rest
-
-      if (sup_total/sup_split_max) > self.min_lift:
-        out_seqs.append((seq[0], sup_total, sup_total/sup_split_max))
+    for (seq, sup_total, lift) in seqmining.get_lifts(baskets, freq_seqs,
+        times = times, max_gap = max_gap, max_window = max_window):
+      if lift > self.min_lift:
+        out_seqs.append((seq, sup_total, lift))
     
     freq_seqs = out_seqs
-    print "found {} sequences with sufficient lift".format(len(freq_seqs))
+    logger.info("found %d sequences with sufficient lift", len(freq_seqs))
     freq_seqs = self.nonmax_suppression_seqs(freq_seqs)
-    print "found {} maximal sequences".format(len(freq_seqs))
+    self.log_phase("sequence filtering", started)
+    logger.info("found %d maximal sequences", len(freq_seqs))
     return freq_seqs
 
-  def mine_rules_relim(self, baskets):
-    print "preparing itemset"
-    relim_input = itemmining.get_relim_input(baskets)
-    
-    print "finding frequent itemsets"
-    self.item_sets = itemmining.relim(relim_input, min_support = len(baskets) * self.min_support)
-    
-    print "finding association rules"
-    self.rules = assocrules.mine_assoc_rules(self.item_sets, len(baskets), 
+  def find_rules(self, baskets, closed = False, partial = False, total = None):
+    ''' mine the rules of self.item_sets, which were mined from baskets (or
+    total baskets, only partial itemsets need the baskets themselves).
+    closed itemsets carry the support of their subsets: the rules are only
+    generated from the closed itemsets, their sides being looked up in them.
+    This is the closed-itemset rule basis, not every rule of the default mode:
+    a rule whose items are not a closed itemset is left out, it has the
+    support and confidence of a rule of its closure with more items on the
+    right. partial ones (maximal or top-k itemsets) don't carry the support
+    of their subsets, so those supports are counted on the baskets, and only
+    the rules of the partial itemsets are found. '''
+    if total is None:
+      total = len(baskets)
+    if not (closed or partial):
+      self.supports = self.item_sets
+      return self.mine_assoc_rules(total)
+
+    if closed:
+      supports = itemmining.get_closed_support_lookup(self.item_sets)
+    else:
+      supports = itemmining.get_support_lookup(itemmining.get_eclat_input(baskets))
+    self.supports = supports
+    return list(assocrules.iter_assoc_rules(self.item_sets.items(), supports,
+        total, min_support = self.min_support,
+        min_confidence = self.min_confidence, min_lift = self.min_lift))
+
+  def mine_assoc_rules(self, total):
+    ''' the rules of self.item_sets, which carry the support of their subsets.
+    '''
+    item_sets = self.item_sets
+    if self.workers:
+      return assocrules.mine_assoc_rules_parallel(item_sets, total,
+          min_support = self.min_support, min_confidence = self.min_confidence,
+          min_lift = self.min_lift, workers = self.workers)
+    return assocrules.mine_assoc_rules(item_sets, total, 
         min_support = self.min_support, min_confidence = self.min_confidence, 
         min_lift = self.min_lift)
-    
+
+  def finish_rules(self, baskets, closed = False, partial = False,
+      total = None):
+    ''' find the rules of self.item_sets and keep the maximal ones, sorted by
+    support. '''
+    if total is None:
+      total = len(baskets)
+    logger.info("finding association rules")
+    started = time.time()
+    self.rules = self.find_rules(baskets, closed = closed, partial = partial,
+        total = total)
+    self.log_phase("rule generation", started)
+
+    started = time.time()
     # sort by support
     self.nonmax_suppression()
     self.rules = sorted(self.rules, key = lambda x: -x[2])
+    self.log_phase("rule suppression", started)
+    logger.info("found %d rules, %d maximal", len(self.rules),
+        len(self.max_rules))
+    self.index_rules(total)
 
-  def mine_rules_fp(self, baskets):
-    print "preparing fptree"
-    fptree = itemmining.get_fptree(baskets, min_support = len(baskets) * self.min_support)
+  def index_rules(self, total):
+    ''' index self.max_rules by their items for query_rules. '''
+    started = time.time()
+    self.rule_index = assocrules.RuleIndex(self.max_rules, self.supports,
+        total)
+    self.log_phase("rule indexing", started)
+
+  def query_rules(self, left = (), right = (), sort_by = 'lift', limit = None):
+    ''' the maximal rules with all the items of left on their left side and
+    all the items of right on their right side, best first. e.g. the rules
+    predicting a token: query_rules(right = [db.token_to_idx[token]]) '''
+    return self.rule_index.query(left, right, sort_by = sort_by,
+        limit = limit)
+
+  def mine_rules_relim(self, baskets, closed = False, maximal = False):
+    logger.info("preparing itemset")
+    started = time.time()
+    relim_input = itemmining.get_relim_input(baskets)
+    self.log_phase("relim input", started)
+    
+    logger.info("finding frequent itemsets")
+    started = time.time()
+    self.item_sets, stats = itemmining.relim(relim_input,
+        min_support = len(baskets) * self.min_support, closed = closed,
+        maximal = maximal, stats = True)
+    self.log_phase("itemset mining", started, stats)
+    logger.info("found %d frequent itemsets", len(self.item_sets))
     
-    print "finding itemsets"
-    self.item_sets = itemmining.fpgrowth(fptree, min_support = len(baskets) * self.min_support)
+    self.finish_rules(baskets, closed = closed, partial = maximal)
+
+  def mine_rules_topk(self, baskets, k):
+    ''' mine the rules of the k most frequent itemsets, without a support
+    threshold. '''
+    logger.info("preparing itemset")
+    started = time.time()
+    miner = itemmining.RelimMiner(itemmining.get_relim_input(baskets))
+    self.log_phase("relim input", started)
+
+    logger.info("finding the %d most frequent itemsets", k)
+    started = time.time()
+    self.item_sets = dict(itemmining.topk(miner, k))
+    self.log_phase("itemset mining", started)
+    logger.info("support threshold raised to %s", miner.min_support)
+
+    self.finish_rules(baskets, partial = True)
+
+  def mine_rules_sampled(self, baskets, sample_size, delta = 0.05,
+      algorithm = 'fpgrowth'):
+    ''' mine rules from the itemsets found by sampling baskets (Toivonen).
+    self.sample_info tells if the result is exact. '''
+    logger.info("finding itemsets on a sample of %d baskets", sample_size)
+    started = time.time()
+    self.item_sets, self.sample_info = itemmining.sample_mine(baskets,
+        self.min_support, sample_size, algorithm = algorithm, delta = delta)
+    self.log_phase("sampled itemset mining", started)
+
+    logger.info("found %d frequent itemsets", len(self.item_sets))
+    if not self.sample_info['exact']:
+      logger.warning("negative border check failed: %d frequent itemsets may be missing",
+          len(self.sample_info['border_misses']))
+
+    self.finish_rules(baskets)
 
-    print "found {} frequent sequences".format(len(self.item_sets))
+  def mine_rules_son(self, chunks, algorithm = 'fpgrowth'):
+    ''' mine rules without holding all the baskets in memory. chunks returns a
+    new iterator over lists of baskets on each call, e.g.
+    lambda: db.query_chunks(10000). '''
+    logger.info("finding itemsets chunk by chunk")
+    started = time.time()
+    self.item_sets, total = itemmining.son(chunks, self.min_support,
+        algorithm = algorithm)
+    self.log_phase("partitioned itemset mining", started)
+    logger.info("found %d frequent itemsets in %d baskets",
+        len(self.item_sets), total)
+
+    self.finish_rules(None, total = total)
+
+  def mine_rules_fp(self, baskets, closed = False, maximal = False):
+    logger.info("preparing fptree")
+    started = time.time()
+    fptree = itemmining.get_fptree(baskets, min_support = len(baskets) * self.min_support)
+    self.log_phase("fptree", started)
     
-    print "finding association rules"
-    self.rules = assocrules.mine_assoc_rules(self.item_sets, len(baskets), 
-        min_support = self.min_support, min_confidence = self.min_confidence, 
-        min_lift = self.min_lift)
+    logger.info("finding itemsets")
+    started = time.time()
+    self.item_sets, stats = itemmining.fpgrowth(fptree,
+        min_support = len(baskets) * self.min_support, closed = closed,
+        maximal = maximal, stats = True)
+    self.log_phase("itemset mining", started, stats)
+    logger.info("found %d frequent itemsets", len(self.item_sets))
     
-    # sort by support
-    self.nonmax_suppression()
+    self.finish_rules(baskets, closed = closed, partial = maximal)
     self.max_rules = sorted(self.max_rules, key = lambda x: -x[2])
 
-    print "found {} maximal rules with sufficient lift".format(len(self.max_rules))
+    logger.info("found %d maximal rules with sufficient lift", len(self.max_rules))
     
   def nonmax_suppression_seqs(self, seqs):
     ''' remove all rules from self.rules that are subsets of other rules. '''
 
     max_seqs = []
+    kept = set()
+    keys = [frozenset(seq[0]) for seq in seqs]
     for idx1, seq1 in enumerate(seqs):
       subsumed = False
-      for idx2, seq2 in enumerate(seqs):
-        if (not idx1 == idx2) and frozenset(seq1[0]) < frozenset(seq2[0]):
+      for idx2, key2 in enumerate(keys):
+        if (not idx1 == idx2) and keys[idx1] < key2:
           subsumed = True
           break
 
-      if not subsumed and not seq1 in max_seqs:
+      if not subsumed and not seq1 in kept:
+        kept.add(seq1)
         max_seqs.append(seq1)
     return max_seqs
 
@@ -115,6 +278,7 @@ class Assoc_Learner:
 
 if __name__ == "__main__":
   # test code
+  logging.basicConfig(level = logging.INFO, format = '%(message)s')
   db = rmdb.RMDB('data/rm.db')
   db.select([1])
   asl = Assoc_Learner(min_support = 0.2, min_confidence = 0.7, min_lift = 1.2)
@@ -1,37 +1,225 @@
+import heapq
+import multiprocessing
+from collections import defaultdict
+
+
 def mine_assoc_rules(isets, total, min_support=2, min_confidence=0.5, 
                      min_lift = 1.0):
     rules = []
-    visited = set()
     for key in sorted(isets, key=lambda k: len(k), reverse=True):
         support = isets[key]
         if support < min_support or len(key) < 2:
             continue
 
-        for item in key:
-            left = frozenset([item])
-            right = key.difference([item])
-            _mine_assoc_rules(left, right, total, support, visited, isets,
-                    min_support, min_confidence, min_lift, rules)
+        _gen_rules(key, support, total, isets, min_confidence, min_lift,
+                rules)
+
+    return rules
+
 
+def mine_assoc_rules_parallel(isets, total, min_support=2,
+        min_confidence=0.5, min_lift=1.0, workers=None):
+    '''Same as `mine_assoc_rules`, but the item sets are split among a pool
+       of `workers` processes. Each worker receives `isets` once, when it
+       starts, and only reads it.
+
+       :param workers: The number of processes. Default to the number of
+        CPUs.
+    '''
+    keys = [key for key in sorted(isets, key=lambda k: len(k), reverse=True)
+            if isets[key] >= min_support and len(key) > 1]
+    if not keys:
+        return []
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    # Item sets are dealt round-robin from the largest, so each chunk gets
+    # a share of the expensive ones.
+    chunk_number = min(workers * 4, len(keys))
+    chunks = [keys[i::chunk_number] for i in range(chunk_number)]
+
+    rules = []
+    pool = multiprocessing.Pool(workers, _init_rules_worker,
+            (isets, total, min_confidence, min_lift))
+    try:
+        for chunk_rules in pool.imap(_gen_rules_chunk, chunks):
+            rules.extend(chunk_rules)
+    finally:
+        pool.close()
+        pool.join()
     return rules
 
 
-def _mine_assoc_rules(left, right, total, rule_support, visited, isets, min_support,
-        min_confidence, min_lift, rules):
-    if (left, right) in visited or len(right) < 1:
-        return
-    else:
-        visited.add((left, right))
-
-    support_a = isets[left]
-    support_b = isets[right]
-    confidence = float(rule_support) / float(support_a)
-    lift = float(rule_support)*total / (float(support_a) * float(support_b))
-    if confidence >= min_confidence and lift > min_lift:
-        rules.append((left, right, rule_support, confidence))
-    # We can try to increase left!
-    for item in right:
-        new_left = left.union([item])
-        new_right = right.difference([item])
-        _mine_assoc_rules(new_left, new_right, total, rule_support, visited, isets,
-                min_support, min_confidence, min_lift, rules)
+_worker_args = None
+
+
+def _init_rules_worker(isets, total, min_confidence, min_lift):
+    global _worker_args
+    _worker_args = (isets, total, min_confidence, min_lift)
+
+
+def _gen_rules_chunk(keys):
+    (isets, total, min_confidence, min_lift) = _worker_args
+    rules = []
+    for key in keys:
+        _gen_rules(key, isets[key], total, isets, min_confidence, min_lift,
+                rules)
+    return rules
+
+
+def _gen_rules(key, rule_support, total, isets, min_confidence, min_lift,
+        rules):
+    # Consequents grow level by level (ap-genrules). Moving an item from the
+    # left to the right side never raises the confidence, so a consequent is
+    # only tried if all its subsets gave confident rules.
+    consequents = [frozenset([item]) for item in key]
+    while consequents:
+        confident = []
+        for right in consequents:
+            left = key.difference(right)
+            support_a = isets[left]
+            confidence = float(rule_support) / float(support_a)
+            if confidence < min_confidence:
+                continue
+            confident.append(right)
+            support_b = isets[right]
+            lift = float(rule_support)*total / (float(support_a) *
+                    float(support_b))
+            if lift > min_lift:
+                rules.append((left, right, rule_support, confidence))
+        if len(consequents[0]) + 1 < len(key):
+            consequents = _next_consequents(confident)
+        else:
+            consequents = None
+
+
+def _next_consequents(consequents):
+    # Joins the consequents sharing all their items but the last one, and
+    # keeps the unions whose subsets are all consequents.
+    known = set(consequents)
+    sets = sorted(tuple(sorted(consequent)) for consequent in consequents)
+    next_consequents = []
+    for i in range(len(sets)):
+        prefix = sets[i][:-1]
+        j = i + 1
+        while j < len(sets) and sets[j][:-1] == prefix:
+            candidate = frozenset(sets[i] + (sets[j][-1],))
+            if all(candidate.difference([item]) in known
+                    for item in candidate):
+                next_consequents.append(candidate)
+            j += 1
+    return next_consequents
+
+
+class _SupportLookup(object):
+
+    def __init__(self, support_func):
+        self.support_func = support_func
+
+    def __getitem__(self, itemset):
+        return self.support_func(itemset)
+
+
+def iter_assoc_rules(itemsets, supports, total, min_support=2,
+        min_confidence=0.5, min_lift=1.0):
+    '''Same as `mine_assoc_rules`, but consumes a stream of item sets and
+       yields the rules of each item set as soon as it is read. Only the rules
+       of the current item set are kept in memory.
+
+       :param itemsets: an iterable of (item set, support), e.g., the output
+        of `itemmining.iter_relim`.
+       :param supports: the support of every subset of the streamed item
+        sets, either a dict or a function such as the one returned by
+        `itemmining.get_support_lookup`.
+       :param total: the number of transactions.
+       :rtype: A generator of (left, right, support, confidence).
+    '''
+    if callable(supports):
+        supports = _SupportLookup(supports)
+    for (key, support) in itemsets:
+        if support < min_support or len(key) < 2:
+            continue
+
+        rules = []
+        _gen_rules(key, support, total, supports, min_confidence, min_lift,
+                rules)
+        for rule in rules:
+            yield rule
+
+
+class RuleIndex(object):
+    '''Association rules indexed by the items of their left and right
+       sides. Each item maps to the set of the ids of the rules with the item
+       on that side, so a query only intersects the sets of its items.
+
+       :param rules: (left, right, support, confidence) tuples, e.g., the
+        output of `mine_assoc_rules`.
+       :param supports: The support of the right sides, either a dict or a
+        function. Needed to sort by lift, with `total`.
+       :param total: The number of transactions.
+    '''
+
+    SORT_KEYS = ('support', 'confidence', 'lift')
+
+    def __init__(self, rules, supports=None, total=None):
+        self.rules = list(rules)
+        self.lifts = None
+        if supports is not None and total is not None:
+            if callable(supports):
+                supports = _SupportLookup(supports)
+            self.lifts = [float(confidence) * total / supports[right]
+                    for (_, right, _, confidence) in self.rules]
+        self.left_index = defaultdict(set)
+        self.right_index = defaultdict(set)
+        for (rule_id, (left, right, _, _)) in enumerate(self.rules):
+            for item in left:
+                self.left_index[item].add(rule_id)
+            for item in right:
+                self.right_index[item].add(rule_id)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def query_ids(self, left=(), right=()):
+        '''Returns the set of the ids of the rules with all the items of
+           `left` on their left side and all the items of `right` on their
+           right side.
+        '''
+        empty = frozenset()
+        postings = [self.left_index.get(item, empty) for item in left]
+        postings.extend(self.right_index.get(item, empty) for item in right)
+        if not postings:
+            return set(range(len(self.rules)))
+        postings.sort(key=len)
+        if len(postings) == 1:
+            return set(postings[0])
+        return postings[0].intersection(*postings[1:])
+
+    def query(self, left=(), right=(), sort_by=None, limit=None):
+        '''Returns the rules matching `query_ids`, in their original order
+           or by decreasing `sort_by` ('support', 'confidence' or 'lift').
+
+           :param limit: Only return this many rules.
+        '''
+        ids = self.query_ids(left, right)
+        if sort_by is None:
+            ids = sorted(ids)
+            if limit is not None:
+                ids = ids[:limit]
+        else:
+            key = self._sort_key(sort_by)
+            if limit is None:
+                ids = sorted(ids, key=key, reverse=True)
+            else:
+                ids = heapq.nlargest(limit, ids, key=key)
+        return [self.rules[rule_id] for rule_id in ids]
+
+    def _sort_key(self, sort_by):
+        if sort_by == 'lift':
+            if self.lifts is None:
+                raise ValueError('Sorting by lift needs supports and total.')
+            return self.lifts.__getitem__
+        elif sort_by == 'confidence':
+            return lambda rule_id: self.rules[rule_id][3]
+        elif sort_by == 'support':
+            return lambda rule_id: self.rules[rule_id][2]
+        raise ValueError('Unknown sort key: {0}'.format(sort_by))
@@ -0,0 +1,354 @@
+'''Benchmarks the mining algorithms on generated datasets.
+
+Run the suite and store the results::
+
+    python -m pymining.benchmark run -o before.json
+
+then, after a change, compare two result files::
+
+    python -m pymining.benchmark run -o after.json
+    python -m pymining.benchmark compare before.json after.json
+
+compare exits with status 1 when a case got slower (or used more memory) than
+the threshold allows.
+'''
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+from timeit import default_timer
+from pymining import assocrules, itemmining, perftesting, seqmining
+from pymining.compat import range
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+DEFAULT_DENSITIES = (0.05, 0.2)
+DEFAULT_TRANSACTION_NUMBERS = (200, 1000)
+DEFAULT_UNIVERSE_SIZES = (50, 500)
+
+
+def get_dataset(density, transaction_number, universe_size, seed=0):
+    '''Returns random transactions over `range(universe_size)`. A transaction
+       holds from 0 to `density * universe_size` items.
+
+       The same parameters and seed always give the same transactions.
+    '''
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        return perftesting.get_random_transactions(
+                transaction_number=transaction_number,
+                max_item_per_transaction=max(int(density * universe_size), 1),
+                universe_size=universe_size,
+                key_alphabet=None)
+    finally:
+        random.setstate(state)
+
+
+def get_datasets(densities=DEFAULT_DENSITIES,
+        transaction_numbers=DEFAULT_TRANSACTION_NUMBERS,
+        universe_sizes=DEFAULT_UNIVERSE_SIZES, seed=0):
+    '''Sweeps the parameters of `get_dataset`.
+
+       :rtype: A list of (parameters, transactions), parameters being a dict.
+    '''
+    datasets = []
+    for (density, transaction_number, universe_size) in itertools.product(
+            densities, transaction_numbers, universe_sizes):
+        parameters = {
+                'density': density,
+                'transactions': transaction_number,
+                'universe': universe_size,
+                'seed': seed,
+                }
+        datasets.append((parameters, get_dataset(density, transaction_number,
+            universe_size, seed)))
+    return datasets
+
+
+def _to_sequences(transactions, seed):
+    # The order of the items in a set is arbitrary, so shuffle them with a
+    # seeded generator to get reproducible sequences.
+    rand = random.Random(seed)
+    sequences = []
+    for transaction in transactions:
+        sequence = sorted(transaction)
+        rand.shuffle(sequence)
+        sequences.append(sequence)
+    return sequences
+
+
+def _relim_case(transactions, support):
+    return lambda: itemmining.relim(itemmining.get_relim_input(transactions),
+            support)
+
+
+def _sam_case(transactions, support):
+    return lambda: itemmining.sam(itemmining.get_sam_input(transactions),
+            support)
+
+
+def _fpgrowth_case(transactions, support):
+    return lambda: itemmining.fpgrowth(itemmining.get_fptree(transactions,
+        min_support=support), support)
+
+
+def _fpgrowth_pruning_case(transactions, support):
+    return lambda: itemmining.fpgrowth(itemmining.get_fptree(transactions,
+        min_support=support), support, pruning=True)
+
+
+def _freq_seq_enum_case(transactions, support):
+    sequences = _to_sequences(transactions, len(transactions))
+    return lambda: seqmining.freq_seq_enum(sequences, support)
+
+
+def _freq_seq_enum_pseudo_case(transactions, support):
+    sequences = _to_sequences(transactions, len(transactions))
+    return lambda: seqmining.freq_seq_enum(sequences, support, pseudo=True)
+
+
+def _freq_seq_bitmap_case(transactions, support):
+    sequences = _to_sequences(transactions, len(transactions))
+    return lambda: seqmining.freq_seq_bitmap(sequences, support)
+
+
+def _plant_patterns(transactions, seed, pattern_number=5, pattern_size=6,
+        rate=0.5):
+    # The items of the random transactions are independent, so their
+    # frequent sets are mostly single items and give almost no rules. Adding
+    # a few fixed patterns to half the transactions gives each pattern a
+    # support of about rate / pattern_number, so its subsets are frequent
+    # and its rules confident.
+    rand = random.Random(seed)
+    items = sorted(set(item for transaction in transactions
+        for item in transaction))
+    patterns = [rand.sample(items, min(pattern_size, len(items)))
+            for _ in range(pattern_number)]
+    planted = []
+    for transaction in transactions:
+        transaction = set(transaction)
+        if rand.random() < rate:
+            transaction.update(rand.choice(patterns))
+        planted.append(sorted(transaction))
+    return planted
+
+
+def _mine_assoc_rules_case(transactions, support):
+    # Only the rule generation is timed, the item sets are mined once.
+    transactions = _plant_patterns(transactions, len(transactions))
+    isets = itemmining.relim(itemmining.get_relim_input(transactions),
+            support)
+    total = len(transactions)
+    return lambda: assocrules.mine_assoc_rules(isets, total, support)
+
+
+# A case returns the function to time from (transactions, support).
+CASES = {
+        'relim': _relim_case,
+        'sam': _sam_case,
+        'fpgrowth': _fpgrowth_case,
+        'fpgrowth_pruning': _fpgrowth_pruning_case,
+        'freq_seq_enum': _freq_seq_enum_case,
+        'freq_seq_enum_pseudo': _freq_seq_enum_pseudo_case,
+        'freq_seq_bitmap': _freq_seq_bitmap_case,
+        'mine_assoc_rules': _mine_assoc_rules_case,
+        }
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def _peak_memory(func):
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def time_case(func, repeat=5, warmup=1, memory=True):
+    '''Times `func` `repeat` times after `warmup` untimed runs.
+
+       The peak memory is measured in a separate run, as tracing the
+       allocations slows `func` down. It is None without tracemalloc
+       (Python 2).
+
+       :rtype: A dict with the 'times', their 'best' and 'median', the
+        'peak_memory' in bytes and the 'size' of the result of `func`.
+    '''
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = default_timer()
+        result = func()
+        times.append(default_timer() - start)
+    return {
+            'times': times,
+            'best': min(times),
+            'median': _median(times),
+            'peak_memory': _peak_memory(func) if memory else None,
+            'size': len(result),
+            }
+
+
+def run(cases=None, datasets=None, support=0.05, repeat=5, warmup=1,
+        memory=True, log=None):
+    '''Runs the benchmark `cases` on all the `datasets`.
+
+       :param cases: The names of the cases to run (keys of `CASES`), all of
+        them by default.
+       :param datasets: A list of (parameters, transactions), by default
+        `get_datasets()`.
+       :param support: The minimal support, as a fraction of the number of
+        transactions. It is never lower than 2.
+       :param log: A function called with a line of progress for each result.
+       :rtype: The results, a dict that can be dumped to JSON.
+    '''
+    if cases is None:
+        cases = sorted(CASES)
+    if datasets is None:
+        datasets = get_datasets()
+    results = []
+    for (parameters, transactions) in datasets:
+        min_support = max(int(support * len(transactions)), 2)
+        for name in cases:
+            result = time_case(CASES[name](transactions, min_support),
+                    repeat, warmup, memory)
+            result['case'] = name
+            result['dataset'] = parameters
+            result['support'] = min_support
+            results.append(result)
+            if log is not None:
+                log('{0} {1}: {2:.6f}s'.format(name,
+                    _dataset_name(parameters), result['median']))
+    return {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'warmup': warmup,
+            'results': results,
+            }
+
+
+def _dataset_name(parameters):
+    return ','.join('{0}={1}'.format(key, parameters[key])
+            for key in sorted(parameters))
+
+
+def _result_key(result):
+    return (result['case'], _dataset_name(result['dataset']),
+            result['support'])
+
+
+def compare(old, new, threshold=0.1):
+    '''Compares the results of two runs, case by case. A case regressed when
+       its median time (or its peak memory) grew by more than `threshold`.
+
+       :rtype: A list of (case, dataset name, metric, old value, new value,
+        regressed), for the cases found in both runs.
+    '''
+    old_results = dict((_result_key(result), result)
+            for result in old['results'])
+    rows = []
+    for result in new['results']:
+        key = _result_key(result)
+        if key not in old_results:
+            continue
+        for metric in ('median', 'peak_memory'):
+            old_value = old_results[key][metric]
+            new_value = result[metric]
+            if old_value is None or new_value is None:
+                continue
+            regressed = new_value > old_value * (1 + threshold)
+            rows.append((key[0], key[1], metric, old_value, new_value,
+                regressed))
+    return rows
+
+
+def _parse_floats(value):
+    return tuple(float(x) for x in value.split(','))
+
+
+def _parse_ints(value):
+    return tuple(int(x) for x in value.split(','))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='pymining benchmarks')
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('-o', '--output', default='benchmark.json')
+    run_parser.add_argument('--cases', type=lambda x: x.split(','),
+            default=sorted(CASES), help='comma separated case names')
+    run_parser.add_argument('--densities', type=_parse_floats,
+            default=DEFAULT_DENSITIES)
+    run_parser.add_argument('--transactions', type=_parse_ints,
+            default=DEFAULT_TRANSACTION_NUMBERS)
+    run_parser.add_argument('--universes', type=_parse_ints,
+            default=DEFAULT_UNIVERSE_SIZES)
+    run_parser.add_argument('--support', type=float, default=0.05,
+            help='relative minimal support')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--warmup', type=int, default=1)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--no-memory', dest='memory',
+            action='store_false', help='skip the peak memory runs')
+
+    compare_parser = subparsers.add_parser('compare',
+            help='flag the regressions between two result files')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        for name in args.cases:
+            if name not in CASES:
+                parser.error('unknown case: {0}'.format(name))
+        datasets = get_datasets(args.densities, args.transactions,
+                args.universes, args.seed)
+        results = run(args.cases, datasets, args.support, args.repeat,
+                args.warmup, args.memory, log=_print_line)
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+        _print_line('Results written to {0}'.format(args.output))
+        return 0
+    elif args.command == 'compare':
+        with open(args.old) as old_file:
+            old = json.load(old_file)
+        with open(args.new) as new_file:
+            new = json.load(new_file)
+        rows = compare(old, new, args.threshold)
+        for (case, dataset, metric, old_value, new_value, regressed) in rows:
+            _print_line('{0}{1} {2} {3}: {4} -> {5} ({6:+.1%})'.format(
+                'REGRESSION ' if regressed else '', case, dataset, metric,
+                old_value, new_value,
+                float(new_value) / old_value - 1 if old_value else 0.0))
+        return 1 if any(row[-1] for row in rows) else 0
+    parser.print_help()
+    return 2
+
+
+def _print_line(line):
+    sys.stdout.write(line + '\n')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,16 @@
+import abc
 import sys
 
 if sys.version_info[0] < 3:
     range = xrange
 else:
     range = range
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(x):
+        return bin(x).count('1')
+
+# Base class of the abstract classes, with the same syntax in Python 2 and 3.
+ABC = abc.ABCMeta('ABC', (object,), {})
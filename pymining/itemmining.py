@@ -1,8 +1,24 @@
+import abc
+import binascii
+import heapq
+import itertools
+import math
+import multiprocessing
+import pickle
+import random
+from time import time
+from array import array
 from collections import defaultdict, deque, OrderedDict
+from pymining.compat import ABC, popcount, range
+from pymining.stats import MiningStats
 
 
 def _sort_transactions_by_freq(transactions, key_func, reverse_int=False,
         reverse_ext=False, sort_ext=True):
+    if isinstance(transactions, TransactionDB):
+        return _sort_db_by_freq(transactions, reverse_int, reverse_ext,
+                sort_ext)
+
     key_seqs = [{key_func(i) for i in sequence} for sequence in transactions]
     frequencies = get_frequencies(key_seqs)
 
@@ -35,11 +51,283 @@ def get_frequencies(transactions):
     return frequencies
 
 
+class TransactionDB(object):
+    '''A compact, integer-encoded transaction database. Build it once with
+       `get_transaction_db` and pass it instead of the transactions to
+       `get_relim_input`, `get_sam_input`, `get_fptree` or `get_eclat_input`.
+    '''
+
+    # Data Structure
+    # keys[r] = key of frequency rank r (rank 0 is the most frequent key)
+    # items = flat array of ranks, offsets = array of len(db) + 1 offsets
+    #
+    # in other words:
+    # items[offsets[t]:offsets[t + 1]] = ranks of the keys of transaction t,
+    # sorted by increasing rank (most frequent key first)
+    # pairs[r] = (frequency, key), shared by all the transactions
+
+    def __init__(self, items, offsets, keys, frequencies):
+        self.items = items
+        self.offsets = offsets
+        self.keys = keys
+        self.frequencies = frequencies
+        self.pairs = [(frequencies[key], key) for key in keys]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        keys = self.keys
+        items = self.items
+        offsets = self.offsets
+        for t in range(len(offsets) - 1):
+            yield tuple([keys[r] for r in items[offsets[t]:offsets[t + 1]]])
+
+    def __str__(self):
+        return '{0} transactions, {1} keys, {2} items'.format(len(self),
+                len(self.keys), len(self.items))
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def get_transaction_db(transactions, key_func=None):
+    '''Given a list of transactions and a key function, returns a compact
+       `TransactionDB` shared by all the item set mining algorithms. Each key
+       is stored once and transactions become runs of frequency ranks in a
+       single flat array.
+
+       :param transactions: a sequence of sequences. [ [transaction items...]]
+        It is iterated twice.
+       :param key_func: a function that returns a comparable key for a
+        transaction item.
+    '''
+    if key_func is None:
+        key_func = lambda e: e
+
+    frequencies = get_frequencies(
+            {key_func(i) for i in sequence} for sequence in transactions)
+    l = [(frequencies[k], k) for k in frequencies]
+    l.sort(reverse=True)
+    keys = [k for (_, k) in l]
+    ranks = {k: r for r, k in enumerate(keys)}
+
+    items = array('i')
+    offsets = array('l', [0])
+    for sequence in transactions:
+        seq_ranks = sorted({ranks[key_func(i)] for i in sequence})
+        items.extend(seq_ranks)
+        offsets.append(len(items))
+
+    return TransactionDB(items, offsets, keys, dict(frequencies))
+
+
+def _sort_db_by_freq(db, reverse_int, reverse_ext, sort_ext):
+    # Same output as _sort_transactions_by_freq, but the (frequency, key)
+    # pairs are shared instead of being created for each item. A larger rank
+    # is an infrequent key, so increasing ranks are decreasing pairs.
+    pairs = db.pairs
+    items = db.items
+    offsets = db.offsets
+    asorted_seqs = []
+    for t in range(len(offsets) - 1):
+        start = offsets[t]
+        end = offsets[t + 1]
+        if start == end:
+            continue
+        seq = tuple(map(pairs.__getitem__, items[start:end]))
+        if not reverse_int:
+            seq = seq[::-1]
+        asorted_seqs.append(seq)
+    if sort_ext:
+        asorted_seqs.sort(reverse=reverse_ext)
+
+    return (asorted_seqs, defaultdict(int, db.frequencies))
+
+
+class _ItemsetIndex(object):
+    '''Inverted index of item sets, to find the indexed supersets of an item
+       set without scanning all of them.'''
+
+    def __init__(self):
+        # postings[key] = ids of the indexed item sets containing key
+        self.postings = defaultdict(set)
+        self.supports = []
+
+    def add(self, itemset, support):
+        i = len(self.supports)
+        self.supports.append(support)
+        for key in itemset:
+            self.postings[key].add(i)
+
+    def supersets(self, itemset):
+        postings = self.postings
+        lists = sorted((postings.get(key, ()) for key in itemset), key=len)
+        if not lists:
+            return set(range(len(self.supports)))
+        ids = set(lists[0])
+        for l in lists[1:]:
+            if not ids:
+                break
+            ids &= l
+        return ids
+
+
+class _Condenser(object):
+    '''Only reports the closed or the maximal item sets of a depth first
+       search and prunes the prefixes that cannot lead to new ones.
+
+       The search must extend a prefix with keys that are visited after all
+       the keys of the prefix (e.g., more frequent keys), so that any closed
+       or maximal superset needing another key was reported before.'''
+
+    def __init__(self, maximal):
+        self.maximal = maximal
+        self.index = _ItemsetIndex()
+
+    def visit(self, fis, support, extensions, report):
+        '''Reports fis if it is closed or maximal.
+
+           :param extensions: (key, support) of the frequent extensions of fis.
+           :rtype: True if the extensions of fis must be mined.
+        '''
+        index = self.index
+        if self.maximal:
+            if extensions:
+                # Lookahead: all the extensions are subsets of a maximal set.
+                lookahead = set(fis)
+                lookahead.update(key for (key, _) in extensions)
+                return not index.supersets(lookahead)
+            if not index.supersets(fis):
+                itemset = frozenset(fis)
+                report[itemset] = support
+                index.add(itemset, support)
+            return False
+
+        # For closed sets, only supersets with the same support matter.
+        if index.supersets([(support, key) for key in fis]):
+            return False
+        for (_, ext_support) in extensions:
+            if ext_support == support:
+                # Not closed, but its closure is one of its extensions.
+                return True
+        itemset = frozenset(fis)
+        report[itemset] = support
+        index.add([(support, key) for key in itemset], support)
+        return True
+
+
+def _get_condenser(closed, maximal):
+    if maximal:
+        return _Condenser(True)
+    elif closed:
+        return _Condenser(False)
+    else:
+        return None
+
+
+class _Constraints(object):
+    '''Item constraints pushed into a depth first search in which a prefix
+       is only extended with the keys visited after its last key.'''
+
+    def __init__(self, required, excluded, max_length, order):
+        self.required = frozenset(required or ())
+        self.excluded = frozenset(excluded or ())
+        self.max_length = max_length
+        # order[key] = position of key in the visit order. Missing keys
+        # can never be added.
+        self.order = order
+
+    def stop(self, fis, key):
+        '''True if no extension of fis with key or a key visited after it
+           can contain all the required keys.'''
+        order = self.order
+        position = order[key]
+        for required_key in self.required:
+            if required_key not in fis and \
+                    order.get(required_key, position - 1) < position:
+                return True
+        return False
+
+    def accepts(self, fis):
+        return self.required.issubset(fis)
+
+    def extends(self, fis):
+        return self.max_length is None or len(fis) < self.max_length
+
+
+def _get_constraints(required, excluded, max_length, order):
+    if not required and not excluded and max_length is None:
+        return None
+    return _Constraints(required, excluded, max_length, order)
+
+
+def get_closed_support_lookup(closed_report):
+    '''Returns a function computing the support of any item set from the
+       closed item sets only: it is the largest support of its closed
+       supersets. Useful as the support lookup of
+       `assocrules.iter_assoc_rules` when mining with closed=True.
+
+       :param closed_report: the output of an algorithm with closed=True.
+    '''
+    index = _ItemsetIndex()
+    for itemset, support in closed_report.items():
+        index.add(itemset, support)
+    supports = index.supports
+
+    def support(itemset):
+        ids = index.supersets(itemset)
+        if not ids:
+            return 0
+        return max(supports[i] for i in ids)
+
+    return support
+
+
+def expand_closed_report(closed_report):
+    '''Returns all the frequent item sets and their support from the closed
+       item sets only. The support of a set is the largest support of its
+       closed supersets, so each closed set, from the most frequent, gives
+       its support to its subsets that don't have one yet.
+
+       :param closed_report: the output of an algorithm with closed=True.
+    '''
+    report = {}
+    for (itemset, support) in sorted(closed_report.items(),
+            key=lambda x: x[1], reverse=True):
+        if itemset in report:
+            continue
+        report[itemset] = support
+        stack = [itemset]
+        while stack:
+            current = stack.pop()
+            for item in current:
+                subset = current - frozenset([item])
+                # The subsets of a set already in the report are there too.
+                if subset and subset not in report:
+                    report[subset] = support
+                    stack.append(subset)
+    return report
+
+
+def _get_stats(stats):
+    if stats:
+        return MiningStats()
+    return None
+
+
+def _with_stats(report, stats):
+    if stats is None:
+        return report
+    return (report, stats)
+
+
 def get_sam_input(transactions, key_func=None):
     '''Given a list of transactions and a key function, returns a data
        structure used as the input of the sam algorithm.
 
        :param transactions: a sequence of sequences. [ [transaction items...]]
+        or a `TransactionDB`, in which case `key_func` is ignored.
        :param key_func: a function that returns a comparable key for a
         transaction item.
     '''
@@ -65,57 +353,215 @@ def get_sam_input(transactions, key_func=None):
     return sam_input
 
 
-def sam(sam_input, min_support=2):
+def sam(sam_input, min_support=2, closed=False, maximal=False, stats=False):
     '''Finds frequent item sets of items appearing in a list of transactions
        based on the Split and Merge algorithm by Christian Borgelt.
 
        :param sam_input: The input of the algorithm. Must come from
         `get_sam_input`.
        :param min_support: The minimal support of a set to be included.
-       :rtype: A set containing the frequent item sets and their support.
+       :param closed: Only report the closed item sets. Default to False.
+       :param maximal: Only report the maximal item sets. Takes precedence
+        over `closed`. Default to False.
+       :param stats: Also return the `MiningStats` of the run. Default to
+        False.
+       :rtype: A set containing the frequent item sets and their support, or
+        a tuple (report, stats) with `stats`.
     '''
     fis = set()
     report = {}
-    _sam(sam_input, fis, report, min_support)
-    return report
+    mining_stats = _get_stats(stats)
+    _sam(sam_input, fis, report, min_support,
+            _get_condenser(closed, maximal), mining_stats)
+    return _with_stats(report, mining_stats)
 
 
-def _sam(sam_input, fis, report, min_support):
+def _sam(sam_input, fis, report, min_support, condenser=None, stats=None):
     n = 0
     a = deque(sam_input)
+    if stats is not None:
+        stats.enter(len(fis))
     while len(a) > 0 and len(a[0][1]) > 0:
-        b = deque()
-        s = 0
-        i = a[0][1][0]
-        while len(a) > 0 and len(a[0][1]) > 0 and a[0][1][0] == i:
-            s = s + a[0][0]
-            a[0] = (a[0][0], a[0][1][1:])
-            if len(a[0][1]) > 0:
-                b.append(a.popleft())
-            else:
-                a.popleft()
-        c = deque(b)
-        d = deque()
-        while len(a) > 0 and len(b) > 0:
-            if a[0][1] > b[0][1]:
-                d.append(b.popleft())
-            elif a[0][1] < b[0][1]:
-                d.append(a.popleft())
+        if stats is not None and not fis:
+            started = time()
+        (i, s, c, a, merged) = _sam_split(a)
+        if stats is not None:
+            stats.merged += merged
+        if s >= min_support:
+            fis.add(i[1])
+            if stats is not None:
+                stats.add_database(len(c))
+            if condenser is None:
+                report[frozenset(fis)] = s
+                #print('{0} with support {1}'.format(fis, s))
+                n = n + 1 + _sam(c, fis, report, min_support, None, stats)
             else:
-                b[0] = (b[0][0] + a[0][0], b[0][1])
-                d.append(b.popleft())
-                a.popleft()
-        while len(a) > 0:
+                counts = defaultdict(int)
+                for (count, rest) in c:
+                    for k in rest:
+                        counts[k[1]] += count
+                extensions = [(k, count) for (k, count) in counts.items()
+                        if count >= min_support]
+                if condenser.visit(fis, s, extensions, report):
+                    n = n + 1 + _sam(c, fis, report, min_support, condenser,
+                            stats)
+            fis.remove(i[1])
+        if stats is not None and not fis:
+            stats.add_item_time(i[1], time() - started)
+    return n
+
+
+def _sam_split(a):
+    # Splits the first item i off the non empty database a. Returns i, its
+    # support s, the conditional database c of i, the database d of the
+    # other items (a and c merged back) and the number of merged rests.
+    b = deque()
+    s = 0
+    i = a[0][1][0]
+    while len(a) > 0 and len(a[0][1]) > 0 and a[0][1][0] == i:
+        s = s + a[0][0]
+        a[0] = (a[0][0], a[0][1][1:])
+        if len(a[0][1]) > 0:
+            b.append(a.popleft())
+        else:
+            a.popleft()
+    c = deque(b)
+    d = deque()
+    merged = 0
+    while len(a) > 0 and len(b) > 0:
+        if a[0][1] > b[0][1]:
+            d.append(b.popleft())
+        elif a[0][1] < b[0][1]:
             d.append(a.popleft())
-        while len(b) > 0:
+        else:
+            b[0] = (b[0][0] + a[0][0], b[0][1])
             d.append(b.popleft())
-        a = d
+            a.popleft()
+            merged += 1
+    while len(a) > 0:
+        d.append(a.popleft())
+    while len(b) > 0:
+        d.append(b.popleft())
+    return (i, s, c, d, merged)
+
+
+def flat_sam(sam_input, min_support=2):
+    '''Same as `sam`, but the transactions are stored once in a flat array of
+       integer codes and each database only holds (weight, start, end) index
+       arrays into it. Splitting an item off a transaction moves its start
+       offset instead of copying its suffix.
+
+       :param sam_input: The input of the algorithm. Must come from
+        `get_sam_input`.
+       :param min_support: The minimal support of a set to be included.
+       :rtype: A set containing the frequent item sets and their support.
+    '''
+    fis = set()
+    report = {}
+    (items, keys, weights, starts, ends) = _get_flat_sam_input(sam_input)
+    _flat_sam(items, keys, weights, starts, ends, fis, report, min_support)
+    return report
+
+
+def _get_flat_sam_input(sam_input):
+    # Codes keep the order of the (frequency, key) pairs, so comparing codes
+    # is comparing pairs.
+    pairs = set()
+    for (_, seq) in sam_input:
+        pairs.update(seq)
+    pairs = sorted(pairs)
+    codes = {pair: code for code, pair in enumerate(pairs)}
+    keys = [key for (_, key) in pairs]
+
+    items = array('i')
+    weights = []
+    starts = []
+    ends = []
+    for (count, seq) in sam_input:
+        weights.append(count)
+        starts.append(len(items))
+        items.extend([codes[pair] for pair in seq])
+        ends.append(len(items))
+    return (items, keys, weights, starts, ends)
+
+
+def _compare_suffixes(items, start1, end1, start2, end2):
+    while start1 < end1 and start2 < end2:
+        x = items[start1]
+        y = items[start2]
+        if x != y:
+            return x - y
+        start1 += 1
+        start2 += 1
+    return (end1 - start1) - (end2 - start2)
+
+
+def _flat_sam(items, keys, aw, as_, ae, fis, report, min_support):
+    n = 0
+    while aw:
+        # Split: the transactions starting with i are at the front.
+        length = len(aw)
+        bw = []
+        bs = []
+        be = []
+        s = 0
+        i = items[as_[0]]
+        pos = 0
+        while pos < length and items[as_[pos]] == i:
+            s = s + aw[pos]
+            start = as_[pos] + 1
+            if start < ae[pos]:
+                bw.append(aw[pos])
+                bs.append(start)
+                be.append(ae[pos])
+            pos += 1
+
+        # Merge the rest of a with b. b is not modified, so it is also the
+        # conditional database.
+        dw = []
+        ds = []
+        de = []
+        b_length = len(bw)
+        j = 0
+        while pos < length and j < b_length:
+            sa = as_[pos]
+            sb = bs[j]
+            x = items[sa]
+            y = items[sb]
+            if x == y:
+                cmp = _compare_suffixes(items, sa, ae[pos], sb, be[j])
+            else:
+                cmp = x - y
+            if cmp > 0:
+                dw.append(bw[j])
+                ds.append(sb)
+                de.append(be[j])
+                j += 1
+            elif cmp < 0:
+                dw.append(aw[pos])
+                ds.append(sa)
+                de.append(ae[pos])
+                pos += 1
+            else:
+                dw.append(aw[pos] + bw[j])
+                ds.append(sb)
+                de.append(be[j])
+                pos += 1
+                j += 1
+        dw.extend(aw[pos:])
+        ds.extend(as_[pos:])
+        de.extend(ae[pos:])
+        dw.extend(bw[j:])
+        ds.extend(bs[j:])
+        de.extend(be[j:])
+        (aw, as_, ae) = (dw, ds, de)
+
         if s >= min_support:
-            fis.add(i[1])
+            fis.add(keys[i])
             report[frozenset(fis)] = s
-            #print('{0} with support {1}'.format(fis, s))
-            n = n + 1 + _sam(c, fis, report, min_support)
-            fis.remove(i[1])
+            n = n + 1 + _flat_sam(items, keys, bw, bs, be, fis, report,
+                    min_support)
+            fis.remove(keys[i])
     return n
 
 
@@ -139,13 +585,17 @@ def _get_key_map(frequencies):
     return key_map
 
 
-def get_relim_input(transactions, key_func=None):
+def get_relim_input(transactions, key_func=None, indexed=True):
     '''Given a list of transactions and a key function, returns a data
        structure used as the input of the relim algorithm.
 
        :param transactions: a sequence of sequences. [ [transaction items...]]
+        or a `TransactionDB`, in which case `key_func` is ignored.
        :param key_func: a function that returns a comparable key for a
         transaction item.
+       :param indexed: Find duplicate transaction rests with a dictionary per
+        prefix instead of scanning the rests of the prefix. The result is the
+        same. Default to True.
     '''
 
     # Data Structure
@@ -167,6 +617,10 @@ def get_relim_input(transactions, key_func=None):
     key_map = _get_key_map(frequencies)
 
     relim_input = _new_relim_input(len(key_map), key_map)
+    if indexed:
+        _fill_relim_input_indexed(relim_input, asorted_seqs, key_map)
+        return (relim_input, key_map)
+
     for seq in asorted_seqs:
         if not seq:
             continue
@@ -185,7 +639,27 @@ def get_relim_input(transactions, key_func=None):
     return (relim_input, key_map)
 
 
-def relim(rinput, min_support=2):
+def _fill_relim_input_indexed(relim_input, asorted_seqs, key_map):
+    # rest_indexes[x] = {rest: position of rest in relim_input[x][1]}
+    rest_indexes = [{} for _ in relim_input]
+    for seq in asorted_seqs:
+        if not seq:
+            continue
+        index = key_map[seq[0]]
+        ((count, char), lists) = relim_input[index]
+        rest = seq[1:]
+        rest_index = rest_indexes[index]
+        try:
+            i = rest_index[rest]
+            lists[i] = (lists[i][0] + 1, rest)
+        except KeyError:
+            rest_index[rest] = len(lists)
+            lists.append((1, rest))
+        relim_input[index] = ((count + 1, char), lists)
+
+
+def relim(rinput, min_support=2, closed=False, maximal=False, required=None,
+        excluded=None, max_length=None, stats=False):
     '''Finds frequent item sets of items appearing in a list of transactions
        based on Recursive Elimination algorithm by Christian Borgelt.
 
@@ -196,89 +670,192 @@ def relim(rinput, min_support=2):
        :param rinput: The input of the algorithm. Must come from
         `get_relim_input`.
        :param min_support: The minimal support of a set to be included.
-       :rtype: A set containing the frequent item sets and their support.
+       :param closed: Only report the closed item sets. Default to False.
+       :param maximal: Only report the maximal item sets. Takes precedence
+        over `closed`. Default to False.
+       :param required: Only report the sets containing all these keys.
+       :param excluded: Only report the sets containing none of these keys.
+       :param max_length: Only report the sets with at most this many keys.
+       :param stats: Also return the `MiningStats` of the run. Default to
+        False.
+       :rtype: A set containing the frequent item sets and their support, or
+        a tuple (report, stats) with `stats`.
     '''
     fis = set()
     report = {}
-    _relim(rinput, fis, report, min_support)
-    return report
+    if excluded:
+        rinput = _exclude_from_relim_input(rinput, frozenset(excluded))
+    (_, key_map) = rinput
+    # Keys are visited by decreasing rank.
+    order = {key: -rank for ((_, key), rank) in key_map.items()}
+    constraints = _get_constraints(required, excluded, max_length, order)
+    condenser = _get_condenser(closed, maximal)
+    if constraints is not None and condenser is not None:
+        raise ValueError('Item constraints cannot be combined with closed or '
+                'maximal item sets.')
+    mining_stats = _get_stats(stats)
+    _relim(rinput, fis, report, min_support, condenser, constraints,
+            mining_stats)
+    return _with_stats(report, mining_stats)
+
+
+def _exclude_from_relim_input(rinput, excluded):
+    # Removes the excluded keys from the transactions, so that they are never
+    # copied to a conditional database.
+    (relim_input, key_map) = rinput
+    new_key_map = OrderedDict()
+    for k in key_map:
+        if k[1] not in excluded:
+            new_key_map[k] = len(new_key_map)
+    new_input = _new_relim_input(len(new_key_map), new_key_map)
+    rest_indexes = [{} for _ in new_input]
+    for ((count, k), lists) in relim_input:
+        # The transactions of the bucket that are only k aren't always in
+        # its lists.
+        seqs = [(count - sum(c for (c, _) in lists), (k,))]
+        seqs.extend((c, (k,) + tuple(rest)) for (c, rest) in lists)
+        for (seq_count, seq) in seqs:
+            seq = tuple(key for key in seq if key[1] not in excluded)
+            if not seq or not seq_count:
+                continue
+            index = new_key_map[seq[0]]
+            ((new_count, char), new_lists) = new_input[index]
+            rest = seq[1:]
+            rest_index = rest_indexes[index]
+            if rest in rest_index:
+                i = rest_index[rest]
+                new_lists[i] = (new_lists[i][0] + seq_count, rest)
+            else:
+                rest_index[rest] = len(new_lists)
+                new_lists.append((seq_count, rest))
+            new_input[index] = ((new_count + seq_count, char), new_lists)
+    return (new_input, new_key_map)
 
 
-def _relim(rinput, fis, report, min_support):
+def _relim(rinput, fis, report, min_support, condenser=None,
+        constraints=None, stats=None):
     (relim_input, key_map) = rinput
     n = 0
     # Maybe this one isn't necessary
     #a = deque(relim_input)
     a = relim_input
+    if stats is not None:
+        stats.enter(len(fis))
     while len(a) > 0:
         item = a[-1][0][1]
         s = a[-1][0][0]
+        if constraints is not None and constraints.stop(fis, item[1]):
+            break
+        if stats is not None and not fis:
+            started = time()
         if s >= min_support:
             fis.add(item[1])
-            #print('Report {0} with support {1}'.format(fis, s))
-            report[frozenset(fis)] = s
-            b = _new_relim_input(len(a) - 1, key_map)
-            rest_lists = a[-1][1]
-
-            for (count, rest) in rest_lists:
-                if not rest:
-                    continue
-                k = rest[0]
-                index = key_map[k]
-                new_rest = rest[1:]
-                # Only add this rest if it's not empty!
-                ((k_count, k), lists) = b[index]
-                if len(new_rest) > 0:
-                    lists.append((count, new_rest))
-                b[index] = ((k_count + count, k), lists)
-            n = n + 1 + _relim((b, key_map), fis, report, min_support)
+            if constraints is not None and not constraints.extends(fis):
+                # No need for a conditional database.
+                if constraints.accepts(fis):
+                    report[frozenset(fis)] = s
+                n = n + 1
+            else:
+                rest_lists = a[-1][1]
+                b = _new_relim_input(len(a) - 1, key_map)
+                _add_relim_rests(b, rest_lists, key_map)
+                if stats is not None:
+                    stats.add_database(sum(len(lists) for (_, lists) in b),
+                            sum(1 for ((k_count, _), _) in b
+                                if 0 < k_count < min_support))
+                if constraints is not None:
+                    if constraints.accepts(fis):
+                        report[frozenset(fis)] = s
+                    n = n + 1 + _relim((b, key_map), fis, report, min_support,
+                            None, constraints, stats)
+                elif condenser is None:
+                    #print('Report {0} with support {1}'.format(fis, s))
+                    report[frozenset(fis)] = s
+                    n = n + 1 + _relim((b, key_map), fis, report, min_support,
+                            None, None, stats)
+                else:
+                    # b only counts the first key of each rest.
+                    counts = defaultdict(int)
+                    for (count, rest) in rest_lists:
+                        for k in rest:
+                            counts[k[1]] += count
+                    extensions = [(k, count) for (k, count) in counts.items()
+                            if count >= min_support]
+                    if condenser.visit(fis, s, extensions, report):
+                        n = n + 1 + _relim((b, key_map), fis, report,
+                                min_support, condenser, None, stats)
             fis.remove(item[1])
 
-        rest_lists = a[-1][1]
-        for (count, rest) in rest_lists:
-            if not rest:
-                continue
-            k = rest[0]
-            index = key_map[k]
-            new_rest = rest[1:]
-            ((k_count, k), lists) = a[index]
-            if len(new_rest) > 0:
-                lists.append((count, new_rest))
-            a[index] = ((k_count + count, k), lists)
+        _add_relim_rests(a, a[-1][1], key_map)
         a.pop()
+        if stats is not None and not fis:
+            stats.add_item_time(item[1], time() - started)
     return n
 
 
+def _add_relim_rests(a, rest_lists, key_map):
+    # Moves each rest to the bucket of its first key in a, without this key.
+    for (count, rest) in rest_lists:
+        if not rest:
+            continue
+        k = rest[0]
+        index = key_map[k]
+        new_rest = rest[1:]
+        ((k_count, k), lists) = a[index]
+        # Only add this rest if it's not empty!
+        if len(new_rest) > 0:
+            lists.append((count, new_rest))
+        a[index] = ((k_count + count, k), lists)
+
+
 class FPNode(object):
 
     root_key = object()
 
+    __slots__ = ('children', 'parent', 'key', 'count', 'next_node')
+
     def __init__(self, key, parent):
-        self.children = {}
+        # Most nodes have at most one child, so children is None, the only
+        # child or a dict {key: child} once there are several children.
+        self.children = None
         self.parent = parent
         self.key = key
         self.count = 0
         self.next_node = None
 
-    def add_path(self, path, index, length, heads, last_insert):
-        if index >= length:
-            return
-
-        child_key = path[index]
-        index += 1
-
-        try:
-            child = self.children[child_key]
-        except Exception:
-            child = self._create_child(child_key, heads, last_insert)
-        child.count += 1
-        heads[child_key][1] += 1
-
-        child.add_path(path, index, length, heads, last_insert)
+    def add_path(self, path, index, length, heads, last_insert, count=1):
+        node = self
+        while index < length:
+            child_key = path[index]
+            index += 1
+
+            child = node._get_child(child_key)
+            if child is None:
+                child = node._create_child(child_key, heads, last_insert)
+            child.count += count
+            heads[child_key][1] += count
+            node = child
+
+    def _get_child(self, child_key):
+        children = self.children
+        if children is None:
+            return None
+        elif children.__class__ is dict:
+            return children.get(child_key)
+        elif children.key == child_key:
+            return children
+        else:
+            return None
 
     def _create_child(self, child_key, heads, last_insert):
         child = FPNode(child_key, self)
-        self.children[child_key] = child
+        children = self.children
+        if children is None:
+            self.children = child
+        elif children.__class__ is dict:
+            children[child_key] = child
+        else:
+            self.children = {children.key: children, child_key: child}
         try:
             last_child = last_insert[child_key]
             last_child.next_node = child
@@ -291,28 +868,33 @@ class FPNode(object):
     def get_cond_tree(self, child, count, visited, heads, last_insert,
             dont_create=False):
 
-        key = self.key
-
-        if dont_create:
-            # This is a head, we don't want to copy it.
-            cond_node = None
-        else:
-            try:
-                cond_node = visited[self]
-            except Exception:
-                cond_node = self._create_cond_child(visited, heads,
-                        last_insert)
-
-        if self.parent is not None:
-            # Recursion
-            parent_node = self.parent.get_cond_tree(cond_node, count, visited,
-                    heads, last_insert, False)
+        # Walk up to the root instead of recursing: paths are as long as the
+        # transactions.
+        node = self
+        cond_child = None
+        while True:
+            if dont_create and node is self:
+                # This is a head, we don't want to copy it.
+                cond_node = None
+            else:
+                try:
+                    cond_node = visited[node]
+                except Exception:
+                    cond_node = node._create_cond_child(visited, heads,
+                            last_insert)
+            if node is self:
+                self_cond_node = cond_node
+            if cond_child is not None:
+                cond_child.parent = cond_node
+            if node.parent is None:
+                break
             if cond_node is not None:
                 cond_node.count += count
-                heads[key][1] += count
-                cond_node.parent = parent_node
+                heads[node.key][1] += count
+            cond_child = cond_node
+            node = node.parent
 
-        return cond_node
+        return self_cond_node
 
     def _create_cond_child(self, visited, heads, last_insert):
         key = self.key
@@ -366,7 +948,12 @@ class FPNode(object):
             visited_parents[ancestor] = self
 
     def __str__(self):
-        child_str = ','.join([str(key) for key in self.children])
+        children = self.children
+        if children is None:
+            children = ()
+        elif children.__class__ is not dict:
+            children = (children.key,)
+        child_str = ','.join([str(key) for key in children])
         return '{0} ({1})  [{2}]  {3}'.format(self.key, self.count, child_str,
                 self.next_node is not None)
 
@@ -379,6 +966,7 @@ def get_fptree(transactions, key_func=None, min_support=2):
        structure used as the input of the relim algorithm.
 
        :param transactions: a sequence of sequences. [ [transaction items...]]
+        or a `TransactionDB`, in which case `key_func` is ignored.
        :param key_func: a function that returns a comparable key for a
         transaction item.
        :param min_support: minimum support.
@@ -416,16 +1004,30 @@ def _init_heads(orig_heads):
 
 
 def _create_cond_tree(head_node, new_heads, pruning):
+    # Returns the number of nodes created.
     visited = {}
     last_insert = {}
     while head_node is not None:
         head_node.get_cond_tree(None, head_node.count, visited, new_heads,
                 last_insert, True)
         head_node = head_node.next_node
-    return new_heads
+    return len(visited)
+
+
+def _get_cond_tree(head_node, heads, min_support, pruning):
+    # Returns the heads of the conditional tree of head_node, the number of
+    # nodes created and the number of nodes merged by the pruning.
+    new_heads = _init_heads(heads)
+    nodes = _create_cond_tree(head_node, new_heads, pruning)
+    merged = 0
+    if pruning:
+        merged = _prune_cond_tree(new_heads, min_support)
+    return (new_heads, nodes, merged)
 
 
 def _prune_cond_tree(heads, min_support):
+    # Returns the number of nodes merged.
+    merged = 0
     merged_before = {}
     merged_now = {}
     for key in reversed(heads):
@@ -442,11 +1044,15 @@ def _prune_cond_tree(heads, min_support):
                     # Only change the previous node if it wasn't merged.
                     previous_node = node
                 node = next_node
+        merged += len(merged_now)
         merged_before = merged_now
         merged_now = {}
+    return merged
 
 
-def fpgrowth(fptree, min_support=2, pruning=False):
+def fpgrowth(fptree, min_support=2, pruning=False, closed=False,
+        maximal=False, required=None, excluded=None, max_length=None,
+        stats=False):
     '''Finds frequent item sets of items appearing in a list of transactions
        based on FP-Growth by Han et al.
 
@@ -454,29 +1060,974 @@ def fpgrowth(fptree, min_support=2, pruning=False):
         `get_fptree`.
        :param min_support: The minimal support of a set.
        :param pruning: Perform a pruning operation. Default to False.
-       :rtype: A set containing the frequent item sets and their support.
+       :param closed: Only report the closed item sets (FPClose). Default to
+        False.
+       :param maximal: Only report the maximal item sets (FPMax). Takes
+        precedence over `closed`. Default to False.
+       :param required: Only report the sets containing all these keys.
+       :param excluded: Only report the sets containing none of these keys.
+       :param max_length: Only report the sets with at most this many keys.
+       :param stats: Also return the `MiningStats` of the run. Default to
+        False.
+       :rtype: A set containing the frequent item sets and their support, or
+        a tuple (report, stats) with `stats`.
     '''
     fis = set()
     report = {}
+    if excluded:
+        fptree = _exclude_from_fptree(fptree, frozenset(excluded),
+                min_support)
+    (_, heads) = fptree
+    # Heads are visited in order, and so are the heads of conditional trees.
+    order = {key: i for (i, key) in enumerate(heads)}
+    constraints = _get_constraints(required, excluded, max_length, order)
+    condenser = _get_condenser(closed, maximal)
+    if constraints is not None and condenser is not None:
+        raise ValueError('Item constraints cannot be combined with closed or '
+                'maximal item sets.')
+    mining_stats = _get_stats(stats)
+    _fpgrowth(fptree, fis, report, min_support, pruning, condenser,
+            constraints, mining_stats)
+    return _with_stats(report, mining_stats)
+
+
+def _exclude_from_fptree(fptree, excluded, min_support):
+    # Rebuilds the tree without the excluded keys, so that they are never
+    # copied to a conditional tree.
+    (root, heads) = fptree
+    paths = [([key for key in path if key not in excluded], count)
+            for (path, count) in _get_paths(root)]
+    keys = [key for key in heads if key not in excluded]
+    return _get_fptree_from_paths(paths, keys, min_support)
+
+
+def _fpgrowth(fptree, fis, report, min_support=2, pruning=True,
+        condenser=None, constraints=None, stats=None):
+    (_, heads) = fptree
+    n = 0
+    if stats is not None:
+        stats.enter(len(fis))
+    for (head_node, head_support) in heads.values():
+        if head_support < min_support:
+            continue
+        if constraints is not None and constraints.stop(fis, head_node.key):
+            break
+
+        fis.add(head_node.key)
+        if constraints is not None and not constraints.extends(fis):
+            # No need for a conditional tree.
+            if constraints.accepts(fis):
+                report[frozenset(fis)] = head_support
+            n = n + 1
+            fis.remove(head_node.key)
+            continue
+        if stats is not None and len(fis) == 1:
+            started = time()
+        (new_heads, nodes, merged) = _get_cond_tree(head_node, heads,
+                min_support, pruning)
+        if stats is not None:
+            stats.add_database(nodes, sum(1 for (_, support) in
+                new_heads.values() if 0 < support < min_support))
+            if pruning:
+                stats.merged += merged
+        if constraints is not None:
+            if constraints.accepts(fis):
+                report[frozenset(fis)] = head_support
+            n = n + 1 + _fpgrowth((None, new_heads), fis, report,
+                    min_support, pruning, None, constraints, stats)
+        elif condenser is None:
+            #print('Report {0} with support {1}'.format(fis, head_support))
+            report[frozenset(fis)] = head_support
+            n = n + 1 + _fpgrowth((None, new_heads), fis, report,
+                    min_support, pruning, None, None, stats)
+        else:
+            extensions = [(key, support) for (key, (_, support)) in
+                    new_heads.items() if support >= min_support]
+            if condenser.visit(fis, head_support, extensions, report):
+                n = n + 1 + _fpgrowth((None, new_heads), fis, report,
+                        min_support, pruning, condenser, None, stats)
+        if stats is not None and len(fis) == 1:
+            stats.add_item_time(head_node.key, time() - started)
+        fis.remove(head_node.key)
+    return n
+
+
+def _get_pattern_base(head_node):
+    # The conditional pattern base of a head: the path from the root to each
+    # node of the head, with the count of the node.
+    paths = []
+    while head_node is not None:
+        path = []
+        node = head_node.parent
+        while node.parent is not None:
+            path.append(node.key)
+            node = node.parent
+        if path:
+            path.reverse()
+            paths.append((path, head_node.count))
+        head_node = head_node.next_node
+    return paths
+
+
+def _get_fptree_from_paths(paths, keys, min_support):
+    counts = defaultdict(int)
+    for (path, count) in paths:
+        for key in path:
+            counts[key] += count
+
+    root = FPNode(FPNode.root_key, None)
+    heads = {}
+    last_insert = {}
+    for (path, count) in paths:
+        path = [key for key in path if counts[key] >= min_support]
+        root.add_path(path, 0, len(path), heads, last_insert, count)
+
+    new_heads = OrderedDict()
+    for key in keys:
+        if key in heads:
+            (head, head_support) = heads[key]
+            new_heads[key] = (head, head_support)
+    return (root, new_heads)
+
+
+def _fpgrowth_head(args):
+    (key, paths, keys, min_support, pruning) = args
+    fptree = _get_fptree_from_paths(paths, keys, min_support)
+    fis = set([key])
+    report = {}
     _fpgrowth(fptree, fis, report, min_support, pruning)
     return report
 
 
-def _fpgrowth(fptree, fis, report, min_support=2, pruning=True):
+def fpgrowth_parallel(fptree, min_support=2, pruning=False, workers=None):
+    '''Same as `fpgrowth`, but the heads of the tree are mined by a pool of
+       `workers` processes. Each worker receives the conditional pattern base
+       of a head, rebuilds its conditional tree and mines it.
+
+       :param fptree: The input of the algorithm. Must come from
+        `get_fptree`.
+       :param min_support: The minimal support of a set.
+       :param pruning: Perform a pruning operation. Default to False.
+       :param workers: The number of processes. Default to the number of
+        CPUs.
+       :rtype: A set containing the frequent item sets and their support.
+    '''
     (_, heads) = fptree
-    n = 0
+    keys = list(heads)
+    report = {}
+    tasks = []
     for (head_node, head_support) in heads.values():
         if head_support < min_support:
             continue
+        report[frozenset([head_node.key])] = head_support
+        paths = _get_pattern_base(head_node)
+        if paths:
+            tasks.append((head_node.key, paths, keys, min_support, pruning))
+    # Largest pattern bases first, so that no worker gets one at the end.
+    tasks.sort(key=lambda task: sum(len(path) for (path, _) in task[1]),
+            reverse=True)
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        for head_report in pool.imap_unordered(_fpgrowth_head, tasks):
+            report.update(head_report)
+    finally:
+        pool.close()
+        pool.join()
+    return report
 
-        fis.add(head_node.key)
-        #print('Report {0} with support {1}'.format(fis, head_support))
+
+def _get_children(node):
+    children = node.children
+    if children is None:
+        return ()
+    elif children.__class__ is dict:
+        return list(children.values())
+    else:
+        return (children,)
+
+
+def _get_end_count(node):
+    # The number of transactions ending at node.
+    return node.count - sum(child.count for child in _get_children(node))
+
+
+def _get_paths(root):
+    paths = []
+    stack = [(root, ())]
+    while stack:
+        (node, path) = stack.pop()
+        for child in _get_children(node):
+            stack.append((child, path + (child.key,)))
+        count = _get_end_count(node)
+        if path and count > 0:
+            paths.append((path, count))
+    return paths
+
+
+class IncrementalFPGrowth(object):
+    '''Maintains the frequent item sets of a changing list of transactions,
+       in the style of FUP (Fast UPdate) by Cheung et al.
+
+       The FP-tree is kept between updates with a fixed key order: keys are
+       ordered by frequency when they are first seen, and new keys come
+       last. The item sets are cached per head. An update only inserts or
+       removes the changed transactions, and only re-mines the heads of their
+       keys: a set only changes if its first visited key is one of them.
+
+       :param min_support: The minimal support of a set. A float lower than 1
+        is a fraction of the number of transactions.
+       :param key_func: a function that returns a comparable key for a
+        transaction item. The keys must be stable across updates.
+       :param pruning: Perform a pruning operation. Default to False.
+    '''
+
+    def __init__(self, min_support=2, key_func=None, pruning=False):
+        self.min_support = min_support
+        self.key_func = key_func
+        self.pruning = pruning
+        self.total = 0
+        self.root = FPNode(FPNode.root_key, None)
+        # heads[key] = [first node of key, support of key]
+        self.heads = {}
+        self.last_insert = {}
+        # order[key] = depth of key in the paths of the tree
+        self.order = {}
+        # head_reports[key] = {item set: support} for the sets mined from
+        # the head of key.
+        self.head_reports = {}
+        self.threshold = None
+
+    @property
+    def report(self):
+        report = {}
+        for head_report in self.head_reports.values():
+            report.update(head_report)
+        return report
+
+    def get_threshold(self):
+        if isinstance(self.min_support, float) and self.min_support < 1:
+            return self.min_support * self.total
+        return self.min_support
+
+    def update(self, added=(), removed=()):
+        '''Inserts the `added` transactions, removes the `removed` ones and
+           re-mines the affected heads.
+
+           :param added: a sequence of sequences. [ [transaction items...]]
+           :param removed: a sequence of sequences that were added before,
+            e.g., the previous version of changed transactions.
+           :rtype: A set containing the frequent item sets and their support.
+        '''
+        key_func = self.key_func
+        if key_func is None:
+            key_func = lambda e: e
+        added = [{key_func(i) for i in sequence} for sequence in added]
+        removed = [{key_func(i) for i in sequence} for sequence in removed]
+
+        # All the removals are checked before anything changes, so a rejected
+        # update leaves the tree as it was.
+        removed_paths = self._get_removed_paths(removed)
+        self._add_keys(added)
+        for path in removed_paths:
+            self._remove_path(path)
+        for keys in added:
+            path = self._get_path(keys)
+            self.root.add_path(path, 0, len(path), self.heads,
+                    self.last_insert)
+        self.total += len(added) - len(removed)
+
+        affected = set()
+        for keys in added + removed:
+            affected.update(keys)
+        threshold = self.get_threshold()
+        if self.threshold is not None and threshold < self.threshold:
+            # Sets below the previous threshold may now be frequent.
+            affected = set(self.heads)
+        elif self.threshold is not None and threshold > self.threshold:
+            for key in self.head_reports:
+                if key not in affected:
+                    self.head_reports[key] = {itemset: support for
+                            (itemset, support) in
+                            self.head_reports[key].items()
+                            if support >= threshold}
+        self.threshold = threshold
+
+        ordered_heads = OrderedDict((key, None) for key in
+                sorted(self.order, key=self.order.get, reverse=True))
+        for key in affected:
+            self.head_reports[key] = self._mine_head(key, ordered_heads,
+                    threshold)
+        return self.report
+
+    def _add_keys(self, added):
+        frequencies = get_frequencies(added)
+        new_keys = [(frequencies[k], k) for k in frequencies
+                if k not in self.order]
+        new_keys.sort(reverse=True)
+        for (_, key) in new_keys:
+            self.order[key] = len(self.order)
+
+    def _get_path(self, keys):
+        order = self.order
+        try:
+            return sorted(keys, key=order.__getitem__)
+        except KeyError:
+            raise ValueError('Cannot remove a transaction that was not '
+                    'added: {0}'.format(keys))
+
+    def _get_removed_paths(self, removed):
+        paths = [self._get_path(keys) for keys in removed]
+        removals = defaultdict(int)
+        for path in paths:
+            if path:
+                removals[tuple(path)] += 1
+        for (path, removal_count) in removals.items():
+            node = self.root
+            for key in path:
+                node = node._get_child(key)
+                if node is None:
+                    break
+            # The transactions ending at a node are counted by the node but
+            # not by its children. The others only share it as a prefix.
+            if node is None or _get_end_count(node) < removal_count:
+                raise ValueError('Cannot remove a transaction that was not '
+                        'added: {0}'.format(list(path)))
+        return paths
+
+    def _remove_path(self, path):
+        node = self.root
+        # Emptied nodes stay in the tree until the next `compact`.
+        for key in path:
+            node = node._get_child(key)
+            node.count -= 1
+            self.heads[node.key][1] -= 1
+
+    def _mine_head(self, key, ordered_heads, threshold):
+        report = {}
+        if key not in self.heads:
+            return report
+        (head_node, head_support) = self.heads[key]
+        if head_support < threshold:
+            return report
+        fis = set([key])
         report[frozenset(fis)] = head_support
-        new_heads = _init_heads(heads)
-        _create_cond_tree(head_node, new_heads, pruning)
-        if pruning:
-            _prune_cond_tree(new_heads, min_support)
-        n = n + 1 + _fpgrowth((None, new_heads), fis, report, min_support,
-                pruning)
-        fis.remove(head_node.key)
+        (new_heads, _, _) = _get_cond_tree(head_node, ordered_heads,
+                threshold, self.pruning)
+        _fpgrowth((None, new_heads), fis, report, threshold, self.pruning)
+        return report
+
+    def get_paths(self):
+        '''Returns the transactions of the tree as a list of (path, count)
+           where path lists the keys of a transaction in tree order.'''
+        return _get_paths(self.root)
+
+    def compact(self):
+        '''Rebuilds the tree without the nodes emptied by removals.'''
+        paths = self.get_paths()
+        self.root = FPNode(FPNode.root_key, None)
+        self.heads = {}
+        self.last_insert = {}
+        for (path, count) in paths:
+            self.root.add_path(path, 0, len(path), self.heads,
+                    self.last_insert, count)
+
+    def dump(self, fileobj):
+        '''Saves the tree and the item sets to `fileobj` (opened in binary
+           mode). The key function is not saved.'''
+        state = {
+                'min_support': self.min_support,
+                'pruning': self.pruning,
+                'total': self.total,
+                'order': self.order,
+                'paths': self.get_paths(),
+                'head_reports': self.head_reports,
+                'threshold': self.threshold,
+                }
+        pickle.dump(state, fileobj, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, fileobj, key_func=None):
+        '''Loads an `IncrementalFPGrowth` saved with `dump`.'''
+        state = pickle.load(fileobj)
+        incremental = cls(state['min_support'], key_func, state['pruning'])
+        incremental.total = state['total']
+        incremental.order = state['order']
+        incremental.head_reports = state['head_reports']
+        incremental.threshold = state['threshold']
+        for (path, count) in state['paths']:
+            incremental.root.add_path(path, 0, len(path), incremental.heads,
+                    incremental.last_insert, count)
+        return incremental
+
+
+class _StackMiner(ABC):
+    '''Drives a mining algorithm with an explicit work stack instead of
+       recursion. Mining can be paused and resumed with `run`, or consumed
+       lazily by iterating over the miner.'''
+
+    def __init__(self, min_support):
+        self.min_support = min_support
+        self.report = {}
+        self.steps = 0
+        self._found = deque()
+        self._stack = []
+
+    @property
+    def finished(self):
+        return not self._stack and not self._found
+
+    def run(self, max_steps=None, timeout=None):
+        '''Mines until there is no work left, `max_steps` steps have been
+           performed by this call or `timeout` seconds have elapsed. Found item
+           sets are added to `report`. Call it again to resume.
+
+           :param max_steps: The maximal number of steps of this call.
+           :param timeout: The maximal wall time of this call, in seconds.
+           :rtype: True if the mining is finished.
+        '''
+        if timeout is not None:
+            deadline = time() + timeout
+        report = self.report
+        found = self._found
+        steps = 0
+        while True:
+            while found:
+                (itemset, support) = found.popleft()
+                report[itemset] = support
+            if not self._stack:
+                return True
+            if max_steps is not None and steps >= max_steps:
+                return False
+            if timeout is not None and time() >= deadline:
+                return False
+            self._step()
+            steps += 1
+            self.steps += 1
+
+    def __iter__(self):
+        found = self._found
+        while True:
+            while found:
+                yield found.popleft()
+            if not self._stack:
+                return
+            self._step()
+            self.steps += 1
+
+    @abc.abstractmethod
+    def _step(self):
+        '''Performs one unit of work on the top frame of the stack and
+           appends the item sets it finds to `_found`.'''
+
+
+class SamMiner(_StackMiner):
+    '''Iterative version of `sam`. Each step splits one item off a database
+       and merges the rest back.
+
+       :param sam_input: The input of the algorithm. Must come from
+        `get_sam_input`.
+       :param min_support: The minimal support of a set to be included.
+    '''
+
+    def __init__(self, sam_input, min_support=2):
+        super(SamMiner, self).__init__(min_support)
+        # Frame: [database, prefix]
+        self._stack.append([deque(sam_input), ()])
+
+    def _step(self):
+        frame = self._stack[-1]
+        (a, prefix) = frame
+        if not (len(a) > 0 and len(a[0][1]) > 0):
+            self._stack.pop()
+            return
+        (i, s, c, frame[0], _) = _sam_split(a)
+        if s >= self.min_support:
+            new_prefix = prefix + (i[1],)
+            self._found.append((frozenset(new_prefix), s))
+            self._stack.append([c, new_prefix])
+
+
+class RelimMiner(_StackMiner):
+    '''Iterative version of `relim`. Each step eliminates one item of a
+       database.
+
+       :param rinput: The input of the algorithm. Must come from
+        `get_relim_input`.
+       :param min_support: The minimal support of a set to be included.
+    '''
+
+    def __init__(self, rinput, min_support=2):
+        super(RelimMiner, self).__init__(min_support)
+        (relim_input, self.key_map) = rinput
+        # Frame: (database, prefix)
+        self._stack.append((relim_input, ()))
+
+    def _step(self):
+        (a, prefix) = self._stack[-1]
+        if not a:
+            self._stack.pop()
+            return
+        key_map = self.key_map
+        item = a[-1][0][1]
+        s = a[-1][0][0]
+        rest_lists = a[-1][1]
+        if s >= self.min_support:
+            new_prefix = prefix + (item[1],)
+            self._found.append((frozenset(new_prefix), s))
+            b = _new_relim_input(len(a) - 1, key_map)
+            _add_relim_rests(b, rest_lists, key_map)
+        else:
+            b = None
+
+        # The conditional database is independent from a, so a can be
+        # reduced before it is mined.
+        _add_relim_rests(a, rest_lists, key_map)
+        a.pop()
+
+        if b is not None:
+            self._stack.append((b, new_prefix))
+
+
+class FPGrowthMiner(_StackMiner):
+    '''Iterative version of `fpgrowth`. Each step builds the conditional
+       tree of one head.
+
+       :param fptree: The input of the algorithm. Must come from
+        `get_fptree`.
+       :param min_support: The minimal support of a set.
+       :param pruning: Perform a pruning operation. Default to False.
+    '''
+
+    def __init__(self, fptree, min_support=2, pruning=False):
+        super(FPGrowthMiner, self).__init__(min_support)
+        self.pruning = pruning
+        (_, heads) = fptree
+        # Frame: (heads, iterator over the heads, prefix)
+        self._stack.append((heads, iter(list(heads.values())), ()))
+
+    def _step(self):
+        (heads, remaining, prefix) = self._stack[-1]
+        min_support = self.min_support
+        for (head_node, head_support) in remaining:
+            if head_support >= min_support:
+                break
+        else:
+            self._stack.pop()
+            return
+
+        new_prefix = prefix + (head_node.key,)
+        self._found.append((frozenset(new_prefix), head_support))
+        (new_heads, _, _) = _get_cond_tree(head_node, heads, min_support,
+                self.pruning)
+        self._stack.append((new_heads, iter(list(new_heads.values())),
+            new_prefix))
+
+
+def iter_sam(sam_input, min_support=2):
+    '''Same as `sam`, but yields each frequent item set and its support as
+       soon as it is found instead of building a report. A thin wrapper
+       over `SamMiner`, which only mines as far as the sets are read.
+
+       :param sam_input: The input of the algorithm. Must come from
+        `get_sam_input`.
+       :param min_support: The minimal support of a set to be included.
+       :rtype: A generator of (frequent item set, support).
+    '''
+    return iter(SamMiner(sam_input, min_support))
+
+
+def iter_relim(rinput, min_support=2):
+    '''Same as `relim`, but yields each frequent item set and its support as
+       soon as it is found instead of building a report. A thin wrapper
+       over `RelimMiner`, which only mines as far as the sets are read.
+
+       :param rinput: The input of the algorithm. Must come from
+        `get_relim_input`.
+       :param min_support: The minimal support of a set to be included.
+       :rtype: A generator of (frequent item set, support).
+    '''
+    return iter(RelimMiner(rinput, min_support))
+
+
+def iter_fpgrowth(fptree, min_support=2, pruning=False):
+    '''Same as `fpgrowth`, but yields each frequent item set and its support
+       as soon as it is found instead of building a report. A thin wrapper
+       over `FPGrowthMiner`, which only mines as far as the sets are read.
+
+       :param fptree: The input of the algorithm. Must come from
+        `get_fptree`.
+       :param min_support: The minimal support of a set.
+       :param pruning: Perform a pruning operation. Default to False.
+       :rtype: A generator of (frequent item set, support).
+    '''
+    return iter(FPGrowthMiner(fptree, min_support, pruning))
+
+
+def topk(miner, k, min_length=2):
+    '''Finds the `k` most frequent item sets having at least `min_length`
+       items. The support threshold of `miner` is raised each time a set
+       enters a full top k, so the search space shrinks as the mining goes.
+
+       :param miner: A `RelimMiner`, `SamMiner` or `FPGrowthMiner`. Its
+        `min_support` is the initial threshold and holds the final one once
+        the mining is over.
+       :param k: The number of item sets, at least 1.
+       :param min_length: The minimal size of a set to be included.
+       :rtype: A list of (item set, support), most frequent first.
+    '''
+    if k < 1:
+        raise ValueError('k must be at least 1.')
+    heap = []
+    # Breaks ties between equal supports without comparing the sets.
+    order = itertools.count()
+    for (itemset, support) in miner:
+        if len(itemset) < min_length:
+            continue
+        if len(heap) < k:
+            heapq.heappush(heap, (support, next(order), itemset))
+        elif support > heap[0][0]:
+            heapq.heapreplace(heap, (support, next(order), itemset))
+        else:
+            continue
+        if len(heap) == k:
+            # Only sets more frequent than the k-th one can enter now.
+            miner.min_support = max(miner.min_support, heap[0][0] + 1)
+    heap.sort(reverse=True)
+    return [(itemset, support) for (support, _, itemset) in heap]
+
+
+def _to_bitset(tids, size):
+    # Bit t of the returned int is set iff t is in tids.
+    bits = bytearray((size >> 3) + 1)
+    for tid in tids:
+        bits[tid >> 3] |= 1 << (tid & 7)
+    bits.reverse()
+    return int(binascii.hexlify(bits), 16)
+
+
+def get_eclat_input(transactions, key_func=None):
+    '''Given a list of transactions and a key function, returns a data
+       structure used as the input of the eclat algorithm.
+
+       :param transactions: a sequence of sequences. [ [transaction items...]]
+        or a `TransactionDB`, in which case `key_func` is ignored.
+       :param key_func: a function that returns a comparable key for a
+        transaction item.
+    '''
+
+    # Data Structure
+    # eclat_input[x] = (key, tidset)
+    #
+    # tidset is a packed bitset (a Python int) whose bit t is set iff
+    # transaction t contains key. Keys are sorted by increasing support, so
+    # each key is only ever extended with more frequent keys.
+
+    if key_func is None or isinstance(transactions, TransactionDB):
+        key_func = lambda e: e
+
+    tids = defaultdict(list)
+    size = 0
+    for tid, transaction in enumerate(transactions):
+        for key in {key_func(i) for i in transaction}:
+            tids[key].append(tid)
+        size = tid + 1
+
+    l = [(len(tids[key]), key) for key in tids]
+    l.sort()
+    return [(key, _to_bitset(tids[key], size)) for (_, key) in l]
+
+
+def eclat(eclat_input, min_support=2, diffsets=False, closed=False,
+        maximal=False):
+    '''Finds frequent item sets of items appearing in a list of transactions
+       based on the Eclat algorithm by Zaki. Supports are obtained by
+       intersecting the tidsets of the items and counting the remaining bits,
+       which is well suited to dense transactions over a small universe.
+
+       :param eclat_input: The input of the algorithm. Must come from
+        `get_eclat_input`.
+       :param min_support: The minimal support of a set to be included.
+       :param diffsets: Use the diffsets of dEclat instead of tidsets below
+        the first level. Default to False.
+       :param closed: Only report the closed item sets (CHARM). Default to
+        False.
+       :param maximal: Only report the maximal item sets. Takes precedence
+        over `closed`. Default to False.
+       :rtype: A set containing the frequent item sets and their support.
+    '''
+    fis = set()
+    report = {}
+    full = 0
+    for (_, tids) in eclat_input:
+        full |= tids
+    items = []
+    for (key, tids) in eclat_input:
+        support = popcount(tids)
+        if support >= min_support:
+            if diffsets:
+                # The diffset of an item w.r.t. the empty prefix.
+                tids = full & ~tids
+            items.append((key, tids, support))
+    condenser = _get_condenser(closed, maximal)
+    if diffsets:
+        _declat(items, fis, report, min_support, condenser)
+    else:
+        _eclat(items, fis, report, min_support, condenser)
+    return report
+
+
+def _eclat(items, fis, report, min_support, condenser=None):
+    n = 0
+    length = len(items)
+    for i in range(length):
+        (key, tids, support) = items[i]
+        fis.add(key)
+        suffix = []
+        for j in range(i + 1, length):
+            (other_key, other_tids, _) = items[j]
+            new_tids = tids & other_tids
+            new_support = popcount(new_tids)
+            if new_support >= min_support:
+                suffix.append((other_key, new_tids, new_support))
+        if condenser is None:
+            report[frozenset(fis)] = support
+            n = n + 1 + _eclat(suffix, fis, report, min_support)
+        elif condenser.visit(fis, support, [(k, sup) for (k, _, sup) in
+                suffix], report):
+            n = n + 1 + _eclat(suffix, fis, report, min_support, condenser)
+        fis.remove(key)
     return n
+
+
+def _declat(items, fis, report, min_support, condenser=None):
+    # items[x] = (key, diffset, support) where diffset contains the
+    # transactions of the prefix that do not contain prefix + key.
+    n = 0
+    length = len(items)
+    for i in range(length):
+        (key, diffs, support) = items[i]
+        fis.add(key)
+        suffix = []
+        for j in range(i + 1, length):
+            (other_key, other_diffs, _) = items[j]
+            new_diffs = other_diffs & ~diffs
+            new_support = support - popcount(new_diffs)
+            if new_support >= min_support:
+                suffix.append((other_key, new_diffs, new_support))
+        if condenser is None:
+            report[frozenset(fis)] = support
+            n = n + 1 + _declat(suffix, fis, report, min_support)
+        elif condenser.visit(fis, support, [(k, sup) for (k, _, sup) in
+                suffix], report):
+            n = n + 1 + _declat(suffix, fis, report, min_support, condenser)
+        fis.remove(key)
+    return n
+
+
+def get_support_lookup(eclat_input):
+    '''Returns a function computing the support of any item set by
+       intersecting the tidsets of `eclat_input`. It holds one bitset per key
+       instead of one entry per frequent item set, which makes it a bounded
+       memory support lookup for `assocrules.iter_assoc_rules`.
+
+       :param eclat_input: Must come from `get_eclat_input`.
+    '''
+    tidsets = dict(eclat_input)
+    full = 0
+    for tids in tidsets.values():
+        full |= tids
+
+    def support(itemset):
+        tids = full
+        for key in itemset:
+            tids &= tidsets.get(key, 0)
+        return popcount(tids)
+
+    return support
+
+
+def _negative_border(itemsets, keys):
+    # The sets that are not in itemsets but whose subsets all are.
+    border = [frozenset([key]) for key in keys
+            if frozenset([key]) not in itemsets]
+    by_length = defaultdict(list)
+    for itemset in itemsets:
+        by_length[len(itemset)].append(tuple(sorted(itemset)))
+    for sets in by_length.values():
+        sets.sort()
+        # Join the sets sharing all their keys but the last one.
+        for i in range(len(sets)):
+            prefix = sets[i][:-1]
+            j = i + 1
+            while j < len(sets) and sets[j][:-1] == prefix:
+                candidate = frozenset(sets[i] + (sets[j][-1],))
+                if candidate not in itemsets and all(
+                        candidate.difference([key]) in itemsets
+                        for key in candidate):
+                    border.append(candidate)
+                j += 1
+    return border
+
+
+def _mine_with(algorithm, transactions, min_support):
+    if algorithm == 'relim':
+        return relim(get_relim_input(transactions), min_support)
+    elif algorithm == 'fpgrowth':
+        return fpgrowth(get_fptree(transactions, min_support=min_support),
+                min_support)
+    else:
+        raise ValueError('Unknown algorithm: {0}'.format(algorithm))
+
+
+def sample_mine(transactions, min_support, sample_size, algorithm='relim',
+        delta=0.05, seed=None):
+    '''Finds frequent item sets with Toivonen's sampling algorithm: a random
+       sample of `sample_size` transactions is mined at a lowered support,
+       then the supports of the sets found and of their negative border are
+       counted in one pass over all the transactions.
+
+       If no set of the negative border turns out to be frequent, the result
+       is exact. The support is lowered so that a frequent set is missed in
+       the sample with a probability of at most `delta` (Hoeffding bound).
+
+       :param transactions: a sequence of sequences. [ [transaction items...]]
+       :param min_support: The minimal support of a set. A float lower than 1
+        is a fraction of the number of transactions.
+       :param sample_size: The number of transactions of the sample. It must
+        be large enough for the lowered support to be at least 2 in the
+        sample, roughly `log(1 / delta) / (2 * relative_support ** 2)`. A
+        ValueError gives the smallest usable size otherwise.
+       :param algorithm: 'relim' or 'fpgrowth'.
+       :param delta: The probability bound of missing a frequent set.
+       :param seed: The seed of the sample.
+       :rtype: A tuple (report, info). report contains the frequent item sets
+        and their support in all the transactions. info is a dict with
+        'exact' (the negative border check passed), 'border_misses' (the
+        frequent sets of the negative border), 'delta', 'epsilon' (how much
+        the relative support was lowered) and 'sample_support'.
+    '''
+    if sample_size < 1:
+        raise ValueError('The sample size must be at least 1.')
+    total = len(transactions)
+    if not total:
+        return ({}, {'exact': True, 'border_misses': {}, 'delta': delta,
+            'epsilon': 0.0, 'sample_support': 0})
+    if isinstance(min_support, float) and min_support < 1:
+        threshold = min_support * total
+    else:
+        threshold = min_support
+    sample_size = min(sample_size, total)
+
+    relative_support = float(threshold) / total
+    bound = math.log(1.0 / delta) / 2
+    epsilon = math.sqrt(bound / sample_size)
+    sample_support = (relative_support - epsilon) * sample_size
+    if sample_support < 2:
+        # At a support of 1, every subset of every sampled transaction is
+        # frequent. The smallest size giving a support of 2 solves
+        # relative_support * x ** 2 - sqrt(bound) * x - 2 = 0, x ** 2 being
+        # the size.
+        x = (math.sqrt(bound) + math.sqrt(bound + 8 * relative_support)) / \
+                (2 * relative_support)
+        min_size = int(math.ceil(x * x))
+        if min_size >= total:
+            advice = 'Mine all the transactions instead.'
+        else:
+            advice = 'Use a sample of at least {0} transactions.'.format(
+                    min_size)
+        raise ValueError('A sample of {0} transactions lowers the support to '
+                '{1:.2f} (epsilon={2:.3f}). {3}'.format(sample_size,
+                    sample_support, epsilon, advice))
+    sample = random.Random(seed).sample(list(transactions), sample_size)
+    candidates = _mine_with(algorithm, sample, sample_support)
+
+    # The verification pass.
+    eclat_input = get_eclat_input(transactions)
+    support = get_support_lookup(eclat_input)
+    keys = [key for (key, _) in eclat_input]
+    report = {}
+    for itemset in candidates:
+        itemset_support = support(itemset)
+        if itemset_support >= threshold:
+            report[itemset] = itemset_support
+    border_misses = {}
+    for itemset in _negative_border(candidates, keys):
+        itemset_support = support(itemset)
+        if itemset_support >= threshold:
+            border_misses[itemset] = itemset_support
+
+    info = {
+            'exact': not border_misses,
+            'border_misses': border_misses,
+            'delta': delta,
+            'epsilon': epsilon,
+            'sample_support': sample_support,
+            }
+    return (report, info)
+
+
+def _merge_short_chunks(chunks, min_size):
+    # Holds a chunk back until the next one is long enough, so that a short
+    # last chunk can still be merged with it.
+    previous = None
+    current = []
+    for chunk in chunks:
+        current.extend(chunk)
+        if len(current) >= min_size:
+            if previous is not None:
+                yield previous
+            previous = current
+            current = []
+    if previous is None:
+        previous = current
+    else:
+        previous.extend(current)
+    if previous:
+        yield previous
+
+
+def son(chunks, min_support, algorithm='relim'):
+    '''Finds frequent item sets in transactions that do not fit in memory
+       with the two pass algorithm of Savasere, Omiecinski and Navathe (SON).
+       The first pass mines each chunk of transactions at the same relative
+       support: a set frequent in all the transactions is frequent in at
+       least one chunk. The second pass counts the supports of these
+       candidates, one chunk at a time.
+
+       A chunk too short to be mined at a local support of at least 2 (at a
+       support of 1, all the subsets of its transactions are candidates) is
+       mined with the next chunks, or with the previous one if it is the
+       last, e.g., the remainder of fixed size chunks.
+
+       :param chunks: A function returning a new iterator over the chunks of
+        transactions (lists of transactions). It is called once per pass and
+        must return the same chunks each time.
+       :param min_support: The minimal support of a set, as a fraction of the
+        number of transactions.
+       :param algorithm: 'relim' or 'fpgrowth', mines the chunks.
+       :rtype: A tuple (report, total). report contains the frequent item
+        sets and their support, total is the number of transactions.
+    '''
+    if not 0 < min_support <= 1:
+        raise ValueError('min_support must be a fraction of the transactions')
+    candidates = set()
+    total = 0
+    for chunk in _merge_short_chunks(chunks(), 2.0 / min_support):
+        total += len(chunk)
+        local_support = max(min_support * len(chunk), 1)
+        candidates.update(_mine_with(algorithm, chunk, local_support))
+
+    # The counting pass.
+    counts = dict((itemset, 0) for itemset in candidates)
+    for chunk in chunks():
+        if not chunk:
+            continue
+        support = get_support_lookup(get_eclat_input(chunk))
+        for itemset in candidates:
+            counts[itemset] += support(itemset)
+
+    threshold = min_support * total
+    report = dict((itemset, count) for (itemset, count) in counts.items()
+            if count >= threshold)
+    return (report, total)
@@ -2,7 +2,8 @@ from time import time
 import random
 import string
 from pymining.itemmining import _fpgrowth, get_fptree, _relim,\
-        get_relim_input, _sam, get_sam_input
+        get_relim_input, _sam, get_sam_input, eclat, get_eclat_input,\
+        _flat_sam, _get_flat_sam_input
 from pymining.compat import range
 
 
@@ -75,13 +76,18 @@ def get_random_transactions(transaction_number=500,
     return transactions
 
 
-def test_sam(should_print=False, ts=None, support=2):
+def test_sam(should_print=False, ts=None, support=2, flat=False):
     if ts is None:
         ts = get_default_transactions()
     sam_input = get_sam_input(ts, lambda e: e)
     fis = set()
     report = {}
-    n = _sam(sam_input, fis, report, support)
+    if flat:
+        (items, keys, weights, starts, ends) = _get_flat_sam_input(sam_input)
+        n = _flat_sam(items, keys, weights, starts, ends, fis, report,
+                support)
+    else:
+        n = _sam(sam_input, fis, report, support)
     if should_print:
         print(n)
         print(report)
@@ -114,10 +120,22 @@ def test_fpgrowth(should_print=False, ts=None, support=2, pruning=False):
     return (n, report)
 
 
+def test_eclat(should_print=False, ts=None, support=2, diffsets=False):
+    if ts is None:
+        ts = get_default_transactions()
+    eclat_input = get_eclat_input(ts, lambda e: e)
+    report = eclat(eclat_input, support, diffsets)
+    n = len(report)
+    if should_print:
+        print(n)
+        print(report)
+    return (n, report)
+
+
 def test_itemset_perf(perf_round=10, sparse=True, seed=None):
-    '''Non-scientifically tests the performance of three algorithms by running
-       `perf_round` rounds of FP-Growth, FP-Growth without pruning, Relim, and
-       SAM.
+    '''Non-scientifically tests the performance of the algorithms by running
+       `perf_round` rounds of FP-Growth, FP-Growth without pruning, Relim,
+       SAM, flat SAM, Eclat and dEclat.
 
        A random set of transactions is created (the same is obviously used
        for all algorithms).
@@ -127,6 +145,9 @@ def test_itemset_perf(perf_round=10, sparse=True, seed=None):
 
        The `seed` parameter can be used to obtain the same sample across
        multiple calls.
+
+       See `pymining.benchmark` for repeatable measurements (memory included)
+       that can be compared between two versions.
     '''
     random.seed(seed)
 
@@ -177,3 +198,57 @@ def test_itemset_perf(perf_round=10, sparse=True, seed=None):
     end = time()
     print('Sam took: {0}'.format(end - start))
     print('Computed {0} frequent item sets.'.format(n))
+
+    start = time()
+    for i in range(perf_round):
+        (n, report) = test_sam(False, transactions, support, flat=True)
+        print('Done round {0}'.format(i))
+    end = time()
+    print('Flat Sam took: {0}'.format(end - start))
+    print('Computed {0} frequent item sets.'.format(n))
+
+    start = time()
+    for i in range(perf_round):
+        (n, report) = test_eclat(False, transactions, support)
+        print('Done round {0}'.format(i))
+    end = time()
+    print('Eclat took: {0}'.format(end - start))
+    print('Computed {0} frequent item sets.'.format(n))
+
+    start = time()
+    for i in range(perf_round):
+        (n, report) = test_eclat(False, transactions, support, diffsets=True)
+        print('Done round {0}'.format(i))
+    end = time()
+    print('dEclat took: {0}'.format(end - start))
+    print('Computed {0} frequent item sets.'.format(n))
+
+
+def test_relim_input_perf(basket_numbers=(250, 500, 1000, 2000, 4000),
+        seed=None):
+    '''Non-scientifically tests how building the relim input scales with the
+       number of baskets, with and without the indexed rest deduplication.
+
+       Baskets are dense and drawn from a small universe, so most prefixes
+       have many distinct rests. The `seed` parameter can be used to obtain
+       the same sample across multiple calls.
+    '''
+    random.seed(seed)
+
+    for basket_number in basket_numbers:
+        transactions = get_random_transactions(
+                transaction_number=basket_number,
+                max_item_per_transaction=20,
+                universe_size=40,
+                key_alphabet=None)
+
+        start = time()
+        get_relim_input(transactions, indexed=False)
+        linear = time() - start
+
+        start = time()
+        get_relim_input(transactions, indexed=True)
+        indexed = time() - start
+
+        print('{0} baskets: linear scan took {1}, indexed took {2}'.format(
+            basket_number, linear, indexed))
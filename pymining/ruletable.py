@@ -0,0 +1,223 @@
+'''A columnar table of association rules backed by NumPy arrays.
+
+Requires NumPy, unlike the rest of pymining.
+'''
+import numbers
+import numpy as np
+from pymining.assocrules import mine_assoc_rules
+from pymining.compat import range
+
+_WORD_BITS = 64
+_WORD_MASK = (1 << _WORD_BITS) - 1
+
+METRICS = ('support', 'confidence', 'lift', 'leverage', 'conviction')
+
+
+class RuleTable(object):
+    '''Association rules stored column by column. Antecedents and
+       consequents are bitmasks over `items`, one row of uint64 words per
+       rule. The metrics are computed for all the rules at once, and
+       filtering, sorting and top-k return new tables sharing `items`.
+
+       :ivar items: The items of the rules, bit i of a mask is items[i].
+       :ivar left: The antecedent masks, an array (rules, words).
+       :ivar right: The consequent masks, an array (rules, words).
+       :ivar support: The support counts of the rules.
+       :ivar left_support: The support counts of the antecedents.
+       :ivar right_support: The support counts of the consequents.
+       :ivar total: The number of transactions.
+    '''
+
+    def __init__(self, items, left, right, support, left_support,
+            right_support, total):
+        self.items = items
+        self.left = left
+        self.right = right
+        self.support = support
+        self.left_support = left_support
+        self.right_support = right_support
+        self.total = total
+        self._compute_metrics()
+
+    def _compute_metrics(self):
+        support = self.support.astype(np.float64)
+        left_support = self.left_support.astype(np.float64)
+        right_support = self.right_support.astype(np.float64)
+        total = float(self.total)
+        self.confidence = support / left_support
+        self.lift = support * total / (left_support * right_support)
+        self.leverage = support / total - \
+                (left_support / total) * (right_support / total)
+        with np.errstate(divide='ignore'):
+            self.conviction = np.where(self.confidence < 1.0,
+                    (1.0 - right_support / total) /
+                    (1.0 - np.minimum(self.confidence, 1.0)),
+                    np.inf)
+
+    def __len__(self):
+        return len(self.support)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.rule(i)
+
+    def rule(self, i):
+        '''Returns rule `i` as a (left, right, support, confidence) tuple,
+           like the rules of `assocrules.mine_assoc_rules`.
+        '''
+        return (self._decode(self.left[i]), self._decode(self.right[i]),
+                int(self.support[i]), float(self.confidence[i]))
+
+    def _decode(self, words):
+        keys = []
+        for (w, word) in enumerate(words.tolist()):
+            while word:
+                low = word & -word
+                keys.append(self.items[w * _WORD_BITS + low.bit_length() - 1])
+                word ^= low
+        return frozenset(keys)
+
+    def _encode(self, keys):
+        index = dict((item, i) for (i, item) in enumerate(self.items))
+        mask = 0
+        for key in keys:
+            if key not in index:
+                return None
+            mask |= 1 << index[key]
+        return _to_words(mask, self.left.shape[1])
+
+    def metric(self, name):
+        if name not in METRICS:
+            raise ValueError('Unknown metric: {0}'.format(name))
+        return getattr(self, name)
+
+    def select(self, indexes):
+        '''Returns a table of the rules at `indexes`, an index array or a
+           boolean mask.
+        '''
+        return RuleTable(self.items, self.left[indexes], self.right[indexes],
+                self.support[indexes], self.left_support[indexes],
+                self.right_support[indexes], self.total)
+
+    def filter(self, min_support=None, min_confidence=None, min_lift=None,
+            min_leverage=None, min_conviction=None):
+        '''Returns a table of the rules meeting all the given thresholds.
+           Lift must be strictly greater than `min_lift`, as in
+           `assocrules.mine_assoc_rules`.
+        '''
+        keep = np.ones(len(self), dtype=bool)
+        if min_support is not None:
+            keep &= self.support >= min_support
+        if min_confidence is not None:
+            keep &= self.confidence >= min_confidence
+        if min_lift is not None:
+            keep &= self.lift > min_lift
+        if min_leverage is not None:
+            keep &= self.leverage >= min_leverage
+        if min_conviction is not None:
+            keep &= self.conviction >= min_conviction
+        return self.select(keep)
+
+    def contains(self, left=(), right=()):
+        '''Returns a table of the rules whose antecedent contains all the
+           items of `left` and whose consequent contains all the items of
+           `right`.
+        '''
+        keep = np.ones(len(self), dtype=bool)
+        for (keys, masks) in ((left, self.left), (right, self.right)):
+            if not keys:
+                continue
+            words = self._encode(keys)
+            if words is None:
+                return self.select(np.zeros(len(self), dtype=bool))
+            keep &= np.all((masks & words) == words, axis=1)
+        return self.select(keep)
+
+    def sort(self, by='lift', reverse=True):
+        '''Returns a table of the rules sorted by the metric `by`, highest
+           first unless `reverse` is False. Ties keep their order.
+        '''
+        values = self.metric(by)
+        if reverse:
+            values = -values
+        return self.select(np.argsort(values, kind='stable'))
+
+    def top(self, k, by='lift'):
+        '''Returns a table of the `k` rules with the highest metric `by`,
+           highest first.
+
+           :param k: The number of rules, an integer of at least 1.
+        '''
+        if not isinstance(k, numbers.Integral) or k < 1:
+            raise ValueError('k must be an integer of at least 1.')
+        values = self.metric(by)
+        if k < len(self):
+            indexes = np.argpartition(-values, k - 1)[:k]
+        else:
+            indexes = np.arange(len(self))
+        return self.select(indexes[np.argsort(-values[indexes],
+            kind='stable')])
+
+
+def _to_words(mask, word_number):
+    return np.array([(mask >> (w * _WORD_BITS)) & _WORD_MASK
+        for w in range(word_number)], dtype=np.uint64)
+
+
+def get_rule_table(rules, isets, total):
+    '''Builds a `RuleTable` from rules.
+
+       :param rules: (left, right, support, confidence) tuples, e.g., the
+        output of `assocrules.mine_assoc_rules`.
+       :param isets: The supports of the sides of the rules, a dict such as
+        the report of the item set miners.
+       :param total: The number of transactions.
+    '''
+    index = {}
+    items = []
+    left_masks = []
+    right_masks = []
+    support = []
+    left_support = []
+    right_support = []
+    for (left, right, rule_support, _) in rules:
+        for side in (left, right):
+            for key in side:
+                if key not in index:
+                    index[key] = len(items)
+                    items.append(key)
+        left_masks.append(_get_mask(left, index))
+        right_masks.append(_get_mask(right, index))
+        support.append(rule_support)
+        left_support.append(isets[left])
+        right_support.append(isets[right])
+
+    word_number = max((len(items) + _WORD_BITS - 1) // _WORD_BITS, 1)
+    left = np.zeros((len(support), word_number), dtype=np.uint64)
+    right = np.zeros((len(support), word_number), dtype=np.uint64)
+    for w in range(word_number):
+        shift = w * _WORD_BITS
+        left[:, w] = [(mask >> shift) & _WORD_MASK for mask in left_masks]
+        right[:, w] = [(mask >> shift) & _WORD_MASK for mask in right_masks]
+    return RuleTable(items, left, right,
+            np.array(support, dtype=np.int64),
+            np.array(left_support, dtype=np.int64),
+            np.array(right_support, dtype=np.int64),
+            total)
+
+
+def _get_mask(keys, index):
+    mask = 0
+    for key in keys:
+        mask |= 1 << index[key]
+    return mask
+
+
+def mine_rule_table(isets, total, min_support=2, min_confidence=0.0,
+        min_lift=0.0):
+    '''Same as `assocrules.mine_assoc_rules`, but returns a `RuleTable`.
+       Mine with loose thresholds once, then `RuleTable.filter` the table
+       instead of mining again.
+    '''
+    return get_rule_table(mine_assoc_rules(isets, total, min_support,
+        min_confidence, min_lift), isets, total)
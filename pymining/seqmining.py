@@ -1,28 +1,373 @@
+import multiprocessing
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
+from time import time
+from pymining.compat import popcount
+from pymining.stats import MiningStats
 
 
-def freq_seq_enum(sequences, min_support):
+def freq_seq_enum(sequences, min_support, required=None, excluded=None,
+        max_length=None, stats=False, pseudo=False, closed=False,
+        workers=None, times=None, max_gap=None, max_window=None):
     '''Enumerates all frequent sequences.
 
        :param sequences: A sequence of sequences.
        :param min_support: The minimal support of a set to be included.
-       :rtype: A set of (frequent_sequence, support).
+       :param required: Only enumerate the sequences containing all these
+        items.
+       :param excluded: Only enumerate the sequences containing none of these
+        items.
+       :param max_length: Only enumerate the sequences with at most this many
+        items.
+       :param stats: Also return the `MiningStats` of the run. Default to
+        False.
+       :param pseudo: Project the sequences by reference instead of copying
+        their suffixes: a projected database holds (sequence index, start)
+        pairs and items are looked up in a per-sequence index of their
+        positions. The result is the same. Default to False.
+       :param closed: Only enumerate the closed sequences, which have no
+        super-sequence with the same support, with BIDE by Wang and Han.
+        Implies `pseudo`. Default to False.
+       :param workers: Mine the sequences with a pool of this many
+        processes. The first-level projected databases are built here and
+        each of them is mined by a worker, the largest first. Default to
+        None, which mines in this process.
+       :param times: The times of the items of the sequences, a sequence of
+        non-decreasing numbers per sequence (e.g., timestamps). Default to
+        the positions of the items.
+       :param max_gap: Only count the occurrences of a sequence whose
+        consecutive items are at most this far apart in time.
+       :param max_window: Only count the occurrences of a sequence whose
+        first and last items are at most this far apart in time.
+       :rtype: A set of (frequent_sequence, support), or a tuple
+        (freq_seqs, stats) with `stats`.
+
+       With `max_gap` or `max_window`, the projected databases keep, for
+       each sequence, the occurrences of the prefix that can still be
+       extended within the constraints, as (end position, start time)
+       pairs. An item is only counted if it follows one of them closely
+       enough, so the sequences that don't fit are never extended.
     '''
     freq_seqs = set()
-    _freq_seq(sequences, tuple(), 0, min_support, freq_seqs)
+    timed = max_gap is not None or max_window is not None
+    if closed and (required or excluded or max_length is not None or
+            timed):
+        raise ValueError('Item and time constraints cannot be combined with '
+                'closed sequences.')
+    if timed and times is None:
+        times = [list(range(len(sequence))) for sequence in sequences]
+    (sequences, times, required) = _filter_sequences(sequences, required,
+            excluded, times)
+    mining_stats = MiningStats() if stats else None
+    if workers is not None:
+        _freq_seq_parallel(sequences, min_support, freq_seqs, required,
+                max_length, mining_stats, pseudo, closed, workers,
+                (times, max_gap, max_window) if timed else None)
+    elif timed:
+        index = _get_position_index(sequences)
+        pdb = [(sid, None) for (sid, (length, _, _)) in enumerate(index)
+                if length > 0]
+        _freq_seq_timed(sequences, index, (times, max_gap, max_window), pdb,
+                tuple(), 0, min_support, freq_seqs, required, max_length,
+                mining_stats)
+    elif closed:
+        index = _get_position_index(sequences)
+        pdb = [(sid, 0) for (sid, (length, _, _)) in enumerate(index)
+                if length > 0]
+        _freq_seq_closed(sequences, index, pdb, tuple(), min_support,
+                freq_seqs, mining_stats)
+    elif pseudo:
+        index = _get_position_index(sequences)
+        pdb = [(sid, 0) for (sid, (length, _, _)) in enumerate(index)
+                if length > 0]
+        _freq_seq_pseudo(index, pdb, tuple(), 0, min_support, freq_seqs,
+                required, max_length, mining_stats)
+    else:
+        _freq_seq(sequences, tuple(), 0, min_support, freq_seqs, required,
+                max_length, mining_stats)
+    if stats:
+        return (freq_seqs, mining_stats)
     return freq_seqs
 
 
-def _freq_seq(sdb, prefix, prefix_support, min_support, freq_seqs):
-    if prefix:
+def freq_seq_bitmap(sequences, min_support, required=None, excluded=None,
+        max_length=None, stats=False):
+    '''Same as `freq_seq_enum`, but based on the vertical bitmaps of SPAM
+       by Ayres et al. An item is represented by a bitmap of its positions
+       in the sequences, and so is a pattern, by the positions where it can
+       end. All the sequences share one integer bitmap, so appending an item
+       to a pattern, which keeps the positions of the item after the first
+       end of the pattern in each sequence, takes a few bitwise operations
+       on the whole database instead of a scan of the projected sequences.
+
+       Fast on dense sequences, which keep most of their items in every
+       projection. On sparse sequences, where the projections are small,
+       `freq_seq_enum` with `pseudo` is faster: the bitmap operations cost
+       the size of the whole database whatever the projection. The memory
+       grows the same way, as the bitmaps of the extendable items are kept
+       at each level of the search.
+
+       :param sequences: A sequence of sequences.
+       :param min_support: The minimal support of a set to be included.
+       :param required: Only enumerate the sequences containing all these
+        items.
+       :param excluded: Only enumerate the sequences containing none of these
+        items.
+       :param max_length: Only enumerate the sequences with at most this many
+        items.
+       :param stats: Also return the `MiningStats` of the run. Default to
+        False.
+       :rtype: A set of (frequent_sequence, support), or a tuple
+        (freq_seqs, stats) with `stats`.
+    '''
+    freq_seqs = set()
+    (sequences, _, required) = _filter_sequences(sequences, required,
+            excluded)
+    (item_bitmaps, starts, guards) = _get_item_bitmaps(sequences)
+    mining_stats = MiningStats() if stats else None
+    _freq_seq_bitmap(item_bitmaps, starts, guards, len(sequences), -1,
+            tuple(), 0, list(item_bitmaps), min_support, freq_seqs, required,
+            max_length, mining_stats)
+    if stats:
+        return (freq_seqs, mining_stats)
+    return freq_seqs
+
+
+def get_lifts(sequences, freq_seqs, times=None, max_gap=None,
+        max_window=None):
+    '''Computes the lift of frequent sequences. For each item of a
+       sequence, the sequence is split into the item and the rest of the
+       sequence without this item, and the lift is the support of the
+       sequence over the largest product of the supports of the two parts.
+       Supports are relative to the number of sequences.
+
+       The parts are sub-sequences, so their supports come from `freq_seqs`.
+       The parts that aren't in it, e.g., the sequences that aren't closed
+       when `freq_seqs` only holds the closed ones, are counted on
+       `sequences`, so a sequence has the same lift in both cases. They are
+       counted with the time constraints `freq_seqs` was mined with, if any.
+
+       :param sequences: The sequences `freq_seqs` was mined from.
+       :param freq_seqs: The output of `freq_seq_enum` or `freq_seq_bitmap`.
+       :param times: The `times` given to `freq_seq_enum`.
+       :param max_gap: The `max_gap` given to `freq_seq_enum`.
+       :param max_window: The `max_window` given to `freq_seq_enum`.
+       :rtype: A list of (sequence, support, lift) for each sequence with at
+        least two distinct items.
+    '''
+    total = float(len(sequences))
+    supports = dict(freq_seqs)
+    splits = []
+    for (seq, support) in freq_seqs:
+        items = frozenset(seq)
+        if len(items) < 2:
+            continue
+        parts = [((item,), tuple(x for x in seq if x != item))
+                for item in items]
+        splits.append((seq, support, parts))
+    missing = set()
+    for (_, _, parts) in splits:
+        for part in parts:
+            missing.update(x for x in part if x not in supports)
+    timed = None
+    if max_gap is not None or max_window is not None:
+        if times is None:
+            times = [list(range(len(sequence))) for sequence in sequences]
+        timed = (times, max_gap, max_window)
+    supports.update(_count_supports(sequences, missing, timed))
+
+    lifts = []
+    for (seq, support, parts) in splits:
+        split_max = max(supports[item_part] * supports[rest]
+                for (item_part, rest) in parts) / (total * total)
+        if split_max > 0:
+            support = support / total
+            lifts.append((seq, support, support / split_max))
+    return lifts
+
+
+def _count_supports(sequences, patterns, timed=None):
+    # Counts the sequences containing each pattern by projecting them, only
+    # counting the occurrences within the time constraints if timed is set.
+    # Patterns sharing a prefix are sorted together and share its projection.
+    index = _get_position_index(sequences)
+    supports = {}
+    if timed is None:
+        pdb = [(sid, 0) for sid in range(len(index))]
+    else:
+        pdb = [(sid, None) for sid in range(len(index))]
+    stack = [(tuple(), pdb)]
+    for pattern in sorted(patterns):
+        while pattern[:len(stack[-1][0])] != stack[-1][0]:
+            stack.pop()
+        (prefix, pdb) = stack[-1]
+        for item in pattern[len(prefix):]:
+            prefix = prefix + (item,)
+            if timed is None:
+                pdb = _project_pseudo(index, pdb, item, keep_empty=True)
+            else:
+                pdb = _project_timed(index, timed, pdb, item)
+            stack.append((prefix, pdb))
+        supports[pattern] = len(pdb)
+    return supports
+
+def _freq_seq_parallel(sequences, min_support, freq_seqs, required,
+        max_length, stats, pseudo, closed, workers, timed=None):
+    # Once the database of a first-level item is projected, the sequences
+    # starting with it are mined independently from the others.
+    if stats is not None:
+        stats.enter(0)
+    if max_length is not None and max_length < 1:
+        return
+    if timed is not None:
+        index = _get_position_index(sequences)
+        pdb = [(sid, None) for (sid, (length, _, _)) in enumerate(index)
+                if length > 0]
+        locally_frequents = _local_freq_items_timed(sequences, index, timed,
+                pdb, min_support)
+    elif closed or pseudo:
+        index = _get_position_index(sequences)
+        pdb = [(sid, 0) for (sid, (length, _, _)) in enumerate(index)
+                if length > 0]
+        locally_frequents = _local_freq_items_pseudo(index, pdb, min_support)
+    else:
+        index = None
+        locally_frequents = _local_freq_items(sequences, tuple(),
+                min_support)
+    if not closed and not _extendable(tuple(), locally_frequents, required,
+            max_length):
+        return
+
+    tasks = []
+    for (item, support) in locally_frequents:
+        if index is None:
+            new_sdb = _project(sequences, (item,))
+            size = sum(len(entry) for entry in new_sdb)
+        elif timed is not None:
+            new_sdb = _project_timed(index, timed, pdb, item)
+            size = sum(index[sid][0] - embeddings[0][0]
+                    for (sid, embeddings) in new_sdb)
+        else:
+            new_sdb = _project_pseudo(index, pdb, item, closed)
+            size = sum(index[sid][0] - start for (sid, start) in new_sdb)
+        if stats is not None:
+            stats.add_database(len(new_sdb))
+        tasks.append((size, item, support, new_sdb))
+    # Largest projected databases first, so that no worker gets one at the
+    # end.
+    tasks.sort(key=lambda task: task[0], reverse=True)
+
+    pool = multiprocessing.Pool(workers, _init_seq_worker,
+            (sequences if closed or timed else None, index, min_support, required,
+                max_length, closed, stats is not None, timed))
+    try:
+        for (item_seqs, item_stats, item, seconds) in pool.imap_unordered(
+                _freq_seq_task, [task[1:] for task in tasks]):
+            freq_seqs.update(item_seqs)
+            if stats is not None:
+                stats.merge(item_stats)
+                stats.add_item_time(item, seconds)
+    finally:
+        pool.close()
+        pool.join()
+
+
+_worker_args = None
+
+
+def _init_seq_worker(sequences, index, min_support, required, max_length,
+        closed, stats, timed):
+    global _worker_args
+    _worker_args = (sequences, index, min_support, required, max_length,
+            closed, stats, timed)
+
+
+def _freq_seq_task(task):
+    (item, support, new_sdb) = task
+    (sequences, index, min_support, required, max_length, closed, stats,
+            timed) = _worker_args
+    freq_seqs = set()
+    mining_stats = MiningStats() if stats else None
+    started = time()
+    if closed:
+        _freq_seq_closed(sequences, index, new_sdb, (item,), min_support,
+                freq_seqs, mining_stats)
+    elif timed is not None:
+        _freq_seq_timed(sequences, index, timed, new_sdb, (item,), support,
+                min_support, freq_seqs, required, max_length, mining_stats)
+    elif index is not None:
+        _freq_seq_pseudo(index, new_sdb, (item,), support, min_support,
+                freq_seqs, required, max_length, mining_stats)
+    else:
+        _freq_seq(new_sdb, (item,), support, min_support, freq_seqs,
+                required, max_length, mining_stats)
+    return (freq_seqs, mining_stats, item, time() - started)
+
+
+def _filter_sequences(sequences, required, excluded, times=None):
+    required = frozenset(required or ())
+    if excluded:
+        # Excluded items can't be part of a pattern, and removing them
+        # doesn't change which patterns a sequence contains. The times of
+        # the other items don't change either.
+        excluded = frozenset(excluded)
+        if times is not None:
+            times = [[item_time for (item, item_time)
+                in zip(sequence, item_times) if item not in excluded]
+                for (sequence, item_times) in zip(sequences, times)]
+        sequences = [[item for item in sequence if item not in excluded]
+                for sequence in sequences]
+    if required:
+        # Only these sequences can contain a pattern with all the required
+        # items.
+        if times is not None:
+            times = [item_times for (sequence, item_times)
+                    in zip(sequences, times) if required.issubset(sequence)]
+        sequences = [sequence for sequence in sequences
+                if required.issubset(sequence)]
+    return (sequences, times, required)
+
+
+def _freq_seq(sdb, prefix, prefix_support, min_support, freq_seqs,
+        required=frozenset(), max_length=None, stats=None):
+    if stats is not None:
+        stats.enter(len(prefix))
+    if prefix and required.issubset(prefix):
         freq_seqs.add((prefix, prefix_support))
+    if max_length is not None and len(prefix) >= max_length:
+        return
     locally_frequents = _local_freq_items(sdb, prefix, min_support)
-    if not locally_frequents:
+    if not _extendable(prefix, locally_frequents, required, max_length):
         return
     for (item, support) in locally_frequents:
+        if stats is not None and not prefix:
+            started = time()
         new_prefix = prefix + (item,)
         new_sdb = _project(sdb, new_prefix)
-        _freq_seq(new_sdb, new_prefix, support, min_support, freq_seqs)
+        if stats is not None:
+            stats.add_database(len(new_sdb))
+        _freq_seq(new_sdb, new_prefix, support, min_support, freq_seqs,
+                required, max_length, stats)
+        if stats is not None and not prefix:
+            stats.add_item_time(item, time() - started)
+
+
+def _extendable(prefix, locally_frequents, required, max_length,
+        reachable=True):
+    # reachable: the items that can't be appended to prefix now can't be
+    # appended to its extensions either.
+    if not locally_frequents:
+        return False
+    if required:
+        missing = required.difference(prefix)
+        if max_length is not None and \
+                len(missing) > max_length - len(prefix):
+            return False
+        if reachable and not missing.issubset(
+                [item for (item, _) in locally_frequents]):
+            # A missing item can't be appended to this prefix.
+            return False
+    return True
 
 
 def _local_freq_items(sdb, prefix, min_support):
@@ -58,3 +403,307 @@ def _project(sdb, prefix):
         if projection:
             new_sdb.append(projection)
     return new_sdb
+
+
+def _get_position_index(sequences):
+    # For each sequence: its length, the positions of each item and the last
+    # position of each item.
+    index = []
+    for sequence in sequences:
+        positions = defaultdict(list)
+        for (position, item) in enumerate(sequence):
+            positions[item].append(position)
+        lasts = dict((item, positions[item][-1]) for item in positions)
+        index.append((len(sequence), dict(positions), lasts))
+    return index
+
+
+def _freq_seq_pseudo(index, pdb, prefix, prefix_support, min_support,
+        freq_seqs, required=frozenset(), max_length=None, stats=None):
+    if stats is not None:
+        stats.enter(len(prefix))
+    if prefix and required.issubset(prefix):
+        freq_seqs.add((prefix, prefix_support))
+    if max_length is not None and len(prefix) >= max_length:
+        return
+    locally_frequents = _local_freq_items_pseudo(index, pdb, min_support)
+    if not _extendable(prefix, locally_frequents, required, max_length):
+        return
+    for (item, support) in locally_frequents:
+        if stats is not None and not prefix:
+            started = time()
+        new_prefix = prefix + (item,)
+        new_pdb = _project_pseudo(index, pdb, item)
+        if stats is not None:
+            stats.add_database(len(new_pdb))
+        _freq_seq_pseudo(index, new_pdb, new_prefix, support, min_support,
+                freq_seqs, required, max_length, stats)
+        if stats is not None and not prefix:
+            stats.add_item_time(item, time() - started)
+
+
+def _local_freq_items_pseudo(index, pdb, min_support):
+    # An item is in the suffix of a sequence if its last position is.
+    items = defaultdict(int)
+    for (sid, start) in pdb:
+        for (item, last) in index[sid][2].items():
+            if last >= start:
+                items[item] += 1
+    return [(item, support) for (item, support) in items.items()
+            if support >= min_support]
+
+
+def _project_pseudo(index, pdb, item, keep_empty=False):
+    new_pdb = []
+    for (sid, start) in pdb:
+        (length, positions, lasts) = index[sid]
+        last = lasts.get(item)
+        if last is None or last < start:
+            continue
+        item_positions = positions[item]
+        new_start = item_positions[bisect_left(item_positions, start)] + 1
+        # Only keep non empty suffixes, unless asked to.
+        if new_start < length or keep_empty:
+            new_pdb.append((sid, new_start))
+    return new_pdb
+
+
+def _freq_seq_timed(sequences, index, timed, pdb, prefix, prefix_support,
+        min_support, freq_seqs, required=frozenset(), max_length=None,
+        stats=None):
+    # pdb holds (sequence index, embeddings) pairs. The embeddings of the
+    # prefix are (end position, start time) pairs sorted by end position,
+    # with the latest start time for each end. None stands for the empty
+    # prefix, which can be extended anywhere.
+    if stats is not None:
+        stats.enter(len(prefix))
+    if prefix and required.issubset(prefix):
+        freq_seqs.add((prefix, prefix_support))
+    if max_length is not None and len(prefix) >= max_length:
+        return
+    locally_frequents = _local_freq_items_timed(sequences, index, timed, pdb,
+            min_support)
+    # With a max gap, an item too far from the prefix can be reached through
+    # the items in between.
+    if not _extendable(prefix, locally_frequents, required, max_length,
+            timed[1] is None):
+        return
+    for (item, support) in locally_frequents:
+        if stats is not None and not prefix:
+            started = time()
+        new_prefix = prefix + (item,)
+        new_pdb = _project_timed(index, timed, pdb, item)
+        if stats is not None:
+            stats.add_database(len(new_pdb))
+        _freq_seq_timed(sequences, index, timed, new_pdb, new_prefix,
+                support, min_support, freq_seqs, required, max_length, stats)
+        if stats is not None and not prefix:
+            stats.add_item_time(item, time() - started)
+
+
+def _get_time_limit(item_times, end, start, max_gap, max_window):
+    # The latest time an item can have to extend an embedding.
+    limit = None
+    if max_gap is not None:
+        limit = item_times[end] + max_gap
+    if max_window is not None and (limit is None or
+            start + max_window < limit):
+        limit = start + max_window
+    return limit
+
+
+def _local_freq_items_timed(sequences, index, timed, pdb, min_support):
+    (times, max_gap, max_window) = timed
+    items = defaultdict(int)
+    for (sid, embeddings) in pdb:
+        if embeddings is None:
+            for item in index[sid][2]:
+                items[item] += 1
+            continue
+        sequence = sequences[sid]
+        item_times = times[sid]
+        visited = set()
+        # The embeddings are sorted by end, so each one only needs to scan
+        # past the positions already scanned.
+        scanned = -1
+        for (end, start) in embeddings:
+            limit = _get_time_limit(item_times, end, start, max_gap,
+                    max_window)
+            stop = bisect_right(item_times, limit, end + 1)
+            for position in range(max(end, scanned) + 1, stop):
+                visited.add(sequence[position])
+            scanned = max(scanned, stop - 1)
+        for item in visited:
+            items[item] += 1
+    return [(item, support) for (item, support) in items.items()
+            if support >= min_support]
+
+
+def _project_timed(index, timed, pdb, item):
+    (times, max_gap, max_window) = timed
+    new_pdb = []
+    for (sid, embeddings) in pdb:
+        positions = index[sid][1].get(item)
+        if positions is None:
+            continue
+        item_times = times[sid]
+        if embeddings is None:
+            new_pdb.append((sid, [(position, item_times[position])
+                for position in positions]))
+            continue
+        starts = {}
+        for (end, start) in embeddings:
+            limit = _get_time_limit(item_times, end, start, max_gap,
+                    max_window)
+            i = bisect_right(positions, end)
+            while i < len(positions) and item_times[positions[i]] <= limit:
+                position = positions[i]
+                if starts.get(position, start) <= start:
+                    starts[position] = start
+                i += 1
+        if starts:
+            new_pdb.append((sid, sorted(starts.items())))
+    return new_pdb
+
+
+def _freq_seq_closed(sequences, index, pdb, prefix, min_support, freq_seqs,
+        stats=None):
+    # pdb holds one entry per sequence containing prefix, even if nothing
+    # follows the prefix, so the support of prefix is len(pdb).
+    if stats is not None:
+        stats.enter(len(prefix))
+    locally_frequents = _local_freq_items_pseudo(index, pdb, min_support)
+    if prefix:
+        if _backward_item(sequences, index, pdb, prefix, True):
+            # BackScan: the prefix and all its extensions can be extended
+            # backward, so none is closed.
+            return
+        support = len(pdb)
+        if not any(item_support == support
+                for (_, item_support) in locally_frequents) and \
+                not _backward_item(sequences, index, pdb, prefix, False):
+            freq_seqs.add((prefix, support))
+    for (item, _) in locally_frequents:
+        if stats is not None and not prefix:
+            started = time()
+        new_pdb = _project_pseudo(index, pdb, item, True)
+        if stats is not None:
+            stats.add_database(len(new_pdb))
+        _freq_seq_closed(sequences, index, new_pdb, prefix + (item,),
+                min_support, freq_seqs, stats)
+        if stats is not None and not prefix:
+            stats.add_item_time(item, time() - started)
+
+
+def _backward_item(sequences, index, pdb, prefix, semi):
+    # Whether an item appears in the i-th maximum period of prefix in all
+    # the sequences, for some i: between the end of the first instance of
+    # prefix[:i - 1] and the i-th last-in-last appearance of prefix. Such an
+    # item can be inserted before prefix[i - 1] without changing the support.
+    # With semi, the periods end at the i-th last-in-first appearance
+    # instead (semi-maximum periods, used by BackScan).
+    # Most candidate items are ruled out by the first few sequences, so the
+    # periods of a sequence are only computed when it is reached.
+    periods = {}
+    for i in range(len(prefix)):
+        common = None
+        for (sid, _) in pdb:
+            if sid not in periods:
+                periods[sid] = _get_periods(index[sid][1], prefix, semi)
+            (begin, end) = periods[sid][i]
+            if common is None:
+                common = set(sequences[sid][begin:end])
+            else:
+                common.intersection_update(sequences[sid][begin:end])
+            if not common:
+                break
+        if common:
+            return True
+    return False
+
+
+def _get_periods(positions, prefix, semi):
+    # The (begin, end) bounds of the periods of prefix in a sequence, given
+    # the positions of its items.
+    firsts = []
+    position = -1
+    for item in prefix:
+        item_positions = positions[item]
+        position = item_positions[bisect_right(item_positions, position)]
+        firsts.append(position)
+    if semi:
+        last = firsts[-1]
+    else:
+        last = positions[prefix[-1]][-1]
+    periods = [None] * len(prefix)
+    for i in range(len(prefix) - 1, -1, -1):
+        if i < len(prefix) - 1:
+            # The last appearance of prefix[i] before the next one.
+            item_positions = positions[prefix[i]]
+            last = item_positions[bisect_left(item_positions, last) - 1]
+        begin = firsts[i - 1] + 1 if i > 0 else 0
+        periods[i] = (begin, last)
+    return periods
+
+
+def _get_item_bitmaps(sequences):
+    # All the sequences are laid out in one bitmap, each sequence followed
+    # by a guard bit. starts has the first bit of each sequence set, guards
+    # the guard bits, and item_bitmaps[item] the positions of item.
+    item_bitmaps = defaultdict(int)
+    starts = 0
+    guards = 0
+    offset = 0
+    for sequence in sequences:
+        starts |= 1 << offset
+        for item in sequence:
+            item_bitmaps[item] |= 1 << offset
+            offset += 1
+        guards |= 1 << offset
+        offset += 1
+    return (item_bitmaps, starts, guards)
+
+
+def _get_lows(bitmap, starts, guards):
+    # The lowest bit of each sequence: subtracting the first bit of a
+    # sequence borrows up to its lowest bit, the guard bit if the sequence
+    # is empty, and never from the next sequence.
+    bitmap |= guards
+    return bitmap & ~(bitmap - starts)
+
+
+def _freq_seq_bitmap(item_bitmaps, starts, guards, size, mask, prefix,
+        prefix_support, candidates, min_support, freq_seqs,
+        required=frozenset(), max_length=None, stats=None):
+    # mask has the bits after the first end of the pattern set in each
+    # sequence, so appending an item is a bitwise and.
+    if stats is not None:
+        stats.enter(len(prefix))
+    if prefix and required.issubset(prefix):
+        freq_seqs.add((prefix, prefix_support))
+    if max_length is not None and len(prefix) >= max_length:
+        return
+    extensions = []
+    for item in candidates:
+        lows = _get_lows(item_bitmaps[item] & mask, starts, guards)
+        support = size - popcount(lows & guards)
+        if support >= min_support:
+            extensions.append((item, support, lows))
+    locally_frequents = [(item, support)
+            for (item, support, _) in extensions]
+    if not _extendable(prefix, locally_frequents, required, max_length):
+        return
+    # An item that can't extend this pattern can't extend a longer one.
+    candidates = [item for (item, _, _) in extensions]
+    for (item, support, lows) in extensions:
+        if stats is not None and not prefix:
+            started = time()
+        if stats is not None:
+            stats.add_database(support)
+        # The bits between the lowest bit and the guard of each sequence.
+        new_mask = (guards - lows) << 1
+        _freq_seq_bitmap(item_bitmaps, starts, guards, size, new_mask,
+                prefix + (item,), support, candidates, min_support,
+                freq_seqs, required, max_length, stats)
+        if stats is not None and not prefix:
+            stats.add_item_time(item, time() - started)
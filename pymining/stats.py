@@ -0,0 +1,82 @@
+class MiningStats(object):
+    '''What a mining run did, filled in by the engines when they are called
+       with `stats=True`. The counters are updated once per recursive call or
+       per conditional database, never per transaction, and not at all when
+       the stats are off.
+
+       :ivar calls: The number of recursive calls.
+       :ivar max_depth: The length of the longest prefix that was extended.
+       :ivar databases: The number of conditional databases (FP-trees for
+        FP-Growth, projected databases for sequences) built.
+       :ivar nodes: The number of entries of these databases: transaction
+        rests, tree nodes or projected sequences.
+       :ivar max_database: The number of entries of the largest of them.
+       :ivar pruned: The number of infrequent items found in these
+        databases (items, not entries).
+       :ivar merged: The number of entries merged with an identical one.
+       :ivar item_times: A list of (item, seconds) for the top-level items,
+        the time spent on the sets or sequences starting with the item.
+    '''
+
+    def __init__(self):
+        self.calls = 0
+        self.max_depth = 0
+        self.databases = 0
+        self.nodes = 0
+        self.max_database = 0
+        self.pruned = 0
+        self.merged = 0
+        self.item_times = []
+
+    def enter(self, depth):
+        self.calls += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def add_database(self, size, pruned=0):
+        self.databases += 1
+        self.nodes += size
+        if size > self.max_database:
+            self.max_database = size
+        self.pruned += pruned
+
+    def add_item_time(self, item, seconds):
+        self.item_times.append((item, seconds))
+
+    def merge(self, other):
+        '''Adds the counters of `other`, the stats of a part of the run
+           (e.g., mined by another process).
+        '''
+        self.calls += other.calls
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.databases += other.databases
+        self.nodes += other.nodes
+        self.max_database = max(self.max_database, other.max_database)
+        self.pruned += other.pruned
+        self.merged += other.merged
+        self.item_times.extend(other.item_times)
+
+    def slowest_items(self, n=5):
+        '''Returns the `n` top-level items that took the longest, as
+           (item, seconds).
+        '''
+        return sorted(self.item_times, key=lambda x: x[1], reverse=True)[:n]
+
+    def as_dict(self):
+        return {
+                'calls': self.calls,
+                'max_depth': self.max_depth,
+                'databases': self.databases,
+                'nodes': self.nodes,
+                'max_database': self.max_database,
+                'pruned': self.pruned,
+                'merged': self.merged,
+                'item_time': sum(seconds for (_, seconds) in self.item_times),
+                }
+
+    def __str__(self):
+        return ', '.join('{0}={1}'.format(key, value) for (key, value) in
+                sorted(self.as_dict().items()))
+
+    def __repr__(self):
+        return 'MiningStats({0})'.format(self)
@@ -42,3 +42,78 @@ class TestAssocRule(unittest.TestCase):
 
         a_rule = (frozenset(['d']), frozenset(['b']), 6, 0.75)
         self.assertTrue(a_rule in rules)
+
+    def testAllSplits(self):
+        ts1 = perftesting.get_default_transactions_alt()
+        relim_input = itemmining.get_relim_input(ts1)
+        report = itemmining.relim(relim_input, 1)
+        total = len(ts1)
+        for min_confidence in (0.0, 0.5, 0.75):
+            expected = set()
+            for (key, support) in report.items():
+                items = sorted(key)
+                for mask in range(1, 2 ** len(items) - 1):
+                    left = frozenset(item for (i, item) in enumerate(items)
+                            if mask & (1 << i))
+                    right = key.difference(left)
+                    confidence = float(support) / report[left]
+                    lift = confidence * total / report[right]
+                    if confidence >= min_confidence and lift > 1.0:
+                        expected.add((left, right, support, confidence))
+            rules = assocrules.mine_assoc_rules(report, total, min_support=1,
+                    min_confidence=min_confidence)
+            self.assertEqual(len(expected), len(rules))
+            self.assertEqual(expected, set(rules))
+
+    def testParallel(self):
+        ts1 = perftesting.get_random_transactions(transaction_number=100,
+                max_item_per_transaction=10, universe_size=12,
+                key_alphabet=None)
+        report = itemmining.relim(itemmining.get_relim_input(ts1), 10)
+        rules = assocrules.mine_assoc_rules(report, len(ts1), min_support=10)
+        parallel_rules = assocrules.mine_assoc_rules_parallel(report,
+                len(ts1), min_support=10, workers=2)
+        self.assertEqual(len(rules), len(parallel_rules))
+        self.assertEqual(set(rules), set(parallel_rules))
+
+    def testRuleIndex(self):
+        ts1 = perftesting.get_default_transactions()
+        relim_input = itemmining.get_relim_input(ts1)
+        report = itemmining.relim(relim_input, 2)
+        rules = assocrules.mine_assoc_rules(report, len(ts1), min_support=2,
+                min_confidence=0.0)
+        index = assocrules.RuleIndex(rules, report, len(ts1))
+        self.assertEqual(rules, index.query())
+
+        expected = [rule for rule in rules
+                if 'b' in rule[0] and 'c' in rule[0] and 'd' in rule[1]]
+        self.assertEqual(expected, index.query(left=['b', 'c'],
+            right=['d']))
+        self.assertEqual([], index.query(left=['b', 'z']))
+
+        by_confidence = index.query(left=['d'], sort_by='confidence')
+        confidences = [rule[3] for rule in by_confidence]
+        self.assertEqual(sorted(confidences, reverse=True), confidences)
+        top = index.query(right=['d'], sort_by='lift', limit=2)
+        lifts = sorted((rule[3] * len(ts1) / report[rule[1]], rule)
+                for rule in rules if 'd' in rule[1])
+        self.assertEqual(2, len(top))
+        self.assertEqual(lifts[-1][0], top[0][3] * len(ts1) /
+                report[top[0][1]])
+        self.assertRaises(ValueError, assocrules.RuleIndex(rules).query,
+                sort_by='lift')
+
+    def testStream(self):
+        ts1 = perftesting.get_default_transactions()
+        relim_input = itemmining.get_relim_input(ts1)
+        report = itemmining.relim(relim_input, 2)
+        rules = assocrules.mine_assoc_rules(report, len(ts1), min_support=2)
+
+        relim_input = itemmining.get_relim_input(ts1)
+        itemsets = itemmining.iter_relim(relim_input, 2)
+        supports = itemmining.get_support_lookup(
+                itemmining.get_eclat_input(ts1))
+        stream_rules = list(assocrules.iter_assoc_rules(itemsets, supports,
+            len(ts1), min_support=2))
+        self.assertEqual(len(rules), len(stream_rules))
+        self.assertEqual(set(rules), set(stream_rules))
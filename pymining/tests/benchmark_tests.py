@@ -0,0 +1,30 @@
+import unittest
+from pymining import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_run(self):
+        datasets = benchmark.get_datasets((0.2,), (50,), (20,))
+        self.assertEqual(datasets[0][1],
+                benchmark.get_dataset(0.2, 50, 20))
+        results = benchmark.run(datasets=datasets, repeat=2, warmup=0)
+        self.assertEqual(len(benchmark.CASES), len(results['results']))
+        for result in results['results']:
+            self.assertEqual(2, len(result['times']))
+            self.assertTrue(result['best'] <= result['median'])
+            if result['case'] == 'mine_assoc_rules':
+                # The planted patterns give rules to generate.
+                self.assertTrue(result['size'] > 0)
+
+    def test_compare(self):
+        datasets = benchmark.get_datasets((0.2,), (50,), (20,))
+        old = benchmark.run(['relim'], datasets, repeat=1, warmup=0,
+                memory=False)
+        new = benchmark.run(['relim', 'sam'], datasets, repeat=1, warmup=0,
+                memory=False)
+        new['results'][0]['median'] = old['results'][0]['median'] * 2
+        rows = benchmark.compare(old, new)
+        self.assertEqual(1, len(rows))
+        self.assertTrue(rows[0][-1])
+        self.assertFalse(benchmark.compare(old, old)[0][-1])
@@ -1,3 +1,5 @@
+import io
+import random
 import unittest
 from pymining import itemmining, perftesting
 
@@ -55,3 +57,297 @@ class TestItemSetAlgo(unittest.TestCase):
         report = itemmining.fpgrowth(fp_input, 2, pruning=False)
         self.assertEqual(19, len(report))
         self.assertEqual(5, report[frozenset(['a', 'b'])])
+
+    def test_eclat(self):
+        ts1 = perftesting.get_default_transactions()
+        eclat_input = itemmining.get_eclat_input(ts1)
+        report = itemmining.eclat(eclat_input, 2)
+        self.assertEqual(17, len(report))
+        self.assertEqual(6, report[frozenset(['b', 'd'])])
+
+        ts2 = perftesting.get_default_transactions_alt()
+        eclat_input = itemmining.get_eclat_input(ts2)
+        report = itemmining.eclat(eclat_input, 2)
+        self.assertEqual(19, len(report))
+        self.assertEqual(5, report[frozenset(['a', 'b'])])
+
+    def test_eclat_diffsets(self):
+        ts1 = perftesting.get_random_transactions(transaction_number=60,
+                max_item_per_transaction=15, universe_size=25,
+                key_alphabet=None)
+        relim_input = itemmining.get_relim_input(ts1)
+        expected = itemmining.relim(relim_input, 5)
+        eclat_input = itemmining.get_eclat_input(ts1)
+        self.assertEqual(expected, itemmining.eclat(eclat_input, 5))
+        self.assertEqual(expected, itemmining.eclat(eclat_input, 5,
+            diffsets=True))
+
+    def test_transaction_db(self):
+        ts1 = perftesting.get_default_transactions_alt()
+        db = itemmining.get_transaction_db(ts1)
+        self.assertEqual(len(ts1), len(db))
+        self.assertEqual('a', db.keys[0])
+        self.assertEqual(set(ts1[1]), set(list(db)[1]))
+
+        relim_input = itemmining.get_relim_input(ts1)
+        self.assertEqual(relim_input, itemmining.get_relim_input(db))
+        sam_input = itemmining.get_sam_input(ts1)
+        self.assertEqual(sam_input, itemmining.get_sam_input(db))
+
+        expected = itemmining.relim(relim_input, 2)
+        fp_input = itemmining.get_fptree(db)
+        self.assertEqual(expected, itemmining.fpgrowth(fp_input, 2))
+        eclat_input = itemmining.get_eclat_input(db)
+        self.assertEqual(expected, itemmining.eclat(eclat_input, 2))
+
+    def test_relim_input_indexed(self):
+        ts1 = perftesting.get_random_transactions(transaction_number=80,
+                max_item_per_transaction=8, universe_size=10,
+                key_alphabet=None)
+        self.assertEqual(itemmining.get_relim_input(ts1, indexed=False),
+                itemmining.get_relim_input(ts1, indexed=True))
+
+    def test_iter(self):
+        ts1 = perftesting.get_default_transactions()
+        relim_input = itemmining.get_relim_input(ts1)
+        expected = itemmining.relim(relim_input, 2)
+
+        relim_input = itemmining.get_relim_input(ts1)
+        self.assertEqual(expected, dict(itemmining.iter_relim(relim_input, 2)))
+        sam_input = itemmining.get_sam_input(ts1)
+        self.assertEqual(expected, dict(itemmining.iter_sam(sam_input, 2)))
+        fp_input = itemmining.get_fptree(ts1)
+        self.assertEqual(expected, dict(itemmining.iter_fpgrowth(fp_input, 2,
+            pruning=True)))
+
+        # The miner behind the generator only mines the sets that are read.
+        miner = itemmining.RelimMiner(itemmining.get_relim_input(ts1), 2)
+        first = next(iter(miner))
+        self.assertEqual(expected[first[0]], first[1])
+        self.assertFalse(miner.finished)
+
+    def test_stack_miners(self):
+        ts1 = perftesting.get_random_transactions(transaction_number=60,
+                max_item_per_transaction=15, universe_size=25,
+                key_alphabet=None)
+        expected = itemmining.relim(itemmining.get_relim_input(ts1), 5)
+
+        miner = itemmining.RelimMiner(itemmining.get_relim_input(ts1), 5)
+        self.assertFalse(miner.run(max_steps=3))
+        self.assertEqual(3, miner.steps)
+        self.assertTrue(miner.run())
+        self.assertTrue(miner.finished)
+        self.assertEqual(expected, miner.report)
+
+        miner = itemmining.SamMiner(itemmining.get_sam_input(ts1), 5)
+        while not miner.run(max_steps=10):
+            pass
+        self.assertEqual(expected, miner.report)
+
+        for pruning in (True, False):
+            miner = itemmining.FPGrowthMiner(itemmining.get_fptree(ts1,
+                min_support=5), 5, pruning)
+            miner.run(timeout=60)
+            self.assertEqual(expected, miner.report)
+
+    def test_long_transactions(self):
+        ts1 = [list(range(3000)), list(range(1500))]
+        fp_input = itemmining.get_fptree(ts1, min_support=1)
+        miner = itemmining.FPGrowthMiner(fp_input, 1)
+        self.assertFalse(miner.run(max_steps=20))
+        self.assertEqual(20, len(miner.report))
+
+    def test_closed_maximal(self):
+        ts1 = perftesting.get_default_transactions()
+        report = itemmining.relim(itemmining.get_relim_input(ts1), 2)
+        closed = {k: v for (k, v) in report.items() if not any(
+            k < k2 and v == v2 for (k2, v2) in report.items())}
+        maximal = {k: v for (k, v) in report.items() if not any(
+            k < k2 for k2 in report)}
+
+        self.assertEqual(closed, itemmining.relim(
+            itemmining.get_relim_input(ts1), 2, closed=True))
+        self.assertEqual(maximal, itemmining.relim(
+            itemmining.get_relim_input(ts1), 2, maximal=True))
+        fp_input = itemmining.get_fptree(ts1)
+        self.assertEqual(closed, itemmining.fpgrowth(fp_input, 2,
+            closed=True))
+        self.assertEqual(maximal, itemmining.fpgrowth(fp_input, 2,
+            maximal=True))
+        self.assertEqual(closed, itemmining.sam(
+            itemmining.get_sam_input(ts1), 2, closed=True))
+        self.assertEqual(maximal, itemmining.eclat(
+            itemmining.get_eclat_input(ts1), 2, maximal=True))
+
+        support = itemmining.get_closed_support_lookup(closed)
+        for (itemset, count) in report.items():
+            self.assertEqual(count, support(itemset))
+        self.assertEqual(report, itemmining.expand_closed_report(closed))
+
+    def test_fpgrowth_parallel(self):
+        ts1 = perftesting.get_random_transactions(transaction_number=60,
+                max_item_per_transaction=15, universe_size=25,
+                key_alphabet=None)
+        fp_input = itemmining.get_fptree(ts1, min_support=5)
+        expected = itemmining.fpgrowth(fp_input, 5)
+        for pruning in (True, False):
+            fp_input = itemmining.get_fptree(ts1, min_support=5)
+            self.assertEqual(expected, itemmining.fpgrowth_parallel(fp_input,
+                5, pruning, workers=2))
+
+    def test_flat_sam(self):
+        ts1 = perftesting.get_default_transactions()
+        sam_input = itemmining.get_sam_input(ts1)
+        report = itemmining.flat_sam(sam_input, 2)
+        self.assertEqual(17, len(report))
+        self.assertEqual(6, report[frozenset(['b', 'd'])])
+
+        ts2 = perftesting.get_random_transactions(transaction_number=60,
+                max_item_per_transaction=15, universe_size=25,
+                key_alphabet=None)
+        (n, report) = perftesting.test_sam(ts=ts2, support=4)
+        self.assertEqual((n, report), perftesting.test_sam(ts=ts2, support=4,
+            flat=True))
+
+    def test_topk(self):
+        ts1 = perftesting.get_random_transactions(transaction_number=60,
+                max_item_per_transaction=15, universe_size=25,
+                key_alphabet=None)
+        report = itemmining.relim(itemmining.get_relim_input(ts1), 2)
+        supports = sorted((v for (k, v) in report.items() if len(k) >= 2),
+                reverse=True)
+
+        miner = itemmining.RelimMiner(itemmining.get_relim_input(ts1))
+        top = itemmining.topk(miner, 10)
+        self.assertEqual(supports[:10], [v for (_, v) in top])
+        for (itemset, support) in top:
+            self.assertEqual(report[itemset], support)
+        self.assertEqual(supports[9] + 1, miner.min_support)
+
+        miner = itemmining.FPGrowthMiner(itemmining.get_fptree(ts1), 2)
+        top = itemmining.topk(miner, 10)
+        self.assertEqual(supports[:10], [v for (_, v) in top])
+        self.assertRaises(ValueError, itemmining.topk, miner, 0)
+
+    def test_constraints(self):
+        ts1 = perftesting.get_default_transactions()
+        report = itemmining.relim(itemmining.get_relim_input(ts1), 2)
+        expected = {k: v for (k, v) in report.items()
+                if 'd' in k and 'c' not in k and len(k) <= 2}
+
+        relim_input = itemmining.get_relim_input(ts1)
+        self.assertEqual(expected, itemmining.relim(relim_input, 2,
+            required=['d'], excluded=['c'], max_length=2))
+        fp_input = itemmining.get_fptree(ts1)
+        self.assertEqual(expected, itemmining.fpgrowth(fp_input, 2,
+            required=['d'], excluded=['c'], max_length=2))
+
+        # Excluded keys are not copied to the conditional databases, and no
+        # database is built past max_length.
+        expected = {k: v for (k, v) in report.items() if len(k) == 1 and
+                'c' not in k}
+        for (engine, engine_input) in ((itemmining.relim,
+                itemmining.get_relim_input(ts1)), (itemmining.fpgrowth,
+                    itemmining.get_fptree(ts1))):
+            (result, stats) = engine(engine_input, 2, excluded=['c'],
+                    max_length=1, stats=True)
+            self.assertEqual(expected, result)
+            self.assertEqual(0, stats.databases)
+
+    def test_incremental_fpgrowth(self):
+        ts1 = perftesting.get_random_transactions(transaction_number=90,
+                max_item_per_transaction=15, universe_size=25,
+                key_alphabet=None)
+        incremental = itemmining.IncrementalFPGrowth(0.1)
+        incremental.update(ts1[:30])
+        incremental.update(ts1[30:60], removed=ts1[:10])
+
+        dump = io.BytesIO()
+        incremental.dump(dump)
+        dump.seek(0)
+        incremental = itemmining.IncrementalFPGrowth.load(dump)
+        report = incremental.update(ts1[60:], removed=ts1[10:20])
+
+        current = ts1[20:]
+        fp_input = itemmining.get_fptree(current)
+        self.assertEqual(itemmining.fpgrowth(fp_input, 0.1 * len(current)),
+                report)
+        incremental.compact()
+        self.assertEqual(len([t for t in current if t]), sum(count for
+            (_, count) in incremental.get_paths()))
+        self.assertRaises(ValueError, incremental.update, removed=[[-1]])
+
+        # A prefix of an added transaction was not added, and a rejected
+        # update changes nothing.
+        incremental = itemmining.IncrementalFPGrowth(1)
+        report = incremental.update([['a', 'b'], ['b']])
+        self.assertRaises(ValueError, incremental.update, removed=[['a']])
+        self.assertRaises(ValueError, incremental.update, [['c']],
+                [['b'], ['b']])
+        self.assertEqual(2, incremental.total)
+        self.assertEqual(report, incremental.update())
+        self.assertEqual({frozenset(['a']): 1, frozenset(['a', 'b']): 1,
+            frozenset(['b']): 1}, incremental.update(removed=[['b']]))
+
+    def test_sample_mine(self):
+        ts1 = perftesting.get_random_transactions(transaction_number=200,
+                max_item_per_transaction=10, universe_size=15,
+                key_alphabet=None)
+        expected = itemmining.relim(itemmining.get_relim_input(ts1), 40)
+        for algorithm in ('relim', 'fpgrowth'):
+            (report, info) = itemmining.sample_mine(ts1, 0.2, 100,
+                    algorithm, seed=1)
+            if info['exact']:
+                self.assertEqual(expected, report)
+            else:
+                for itemset in report:
+                    self.assertEqual(expected[itemset], report[itemset])
+                for itemset in info['border_misses']:
+                    self.assertTrue(itemset in expected)
+
+        (report, info) = itemmining.sample_mine(ts1, 40, 200, delta=0.5)
+        self.assertTrue(info['exact'])
+        self.assertEqual(expected, report)
+
+        # The sample would be mined at a support lower than 2.
+        self.assertRaises(ValueError, itemmining.sample_mine, ts1, 0.05, 100)
+        self.assertRaises(ValueError, itemmining.sample_mine, ts1, 0.2, 0)
+        self.assertEqual({}, itemmining.sample_mine([], 1, 10)[0])
+
+    def test_stats(self):
+        ts1 = perftesting.get_default_transactions()
+        expected = itemmining.relim(itemmining.get_relim_input(ts1), 2)
+        runs = (
+                itemmining.relim(itemmining.get_relim_input(ts1), 2,
+                    stats=True),
+                itemmining.sam(itemmining.get_sam_input(ts1), 2, stats=True),
+                itemmining.fpgrowth(itemmining.get_fptree(ts1), 2,
+                    pruning=True, stats=True),
+                )
+        for (report, stats) in runs:
+            self.assertEqual(expected, report)
+            self.assertEqual(len(report) + 1, stats.calls)
+            self.assertEqual(3, stats.max_depth)
+            self.assertEqual(5, len(stats.item_times))
+            self.assertTrue(stats.databases > 0)
+            self.assertTrue(stats.nodes >= stats.max_database > 0)
+
+    def test_son(self):
+        ts1 = perftesting.get_random_transactions(transaction_number=200,
+                max_item_per_transaction=10, universe_size=15,
+                key_alphabet=None)
+        expected = itemmining.relim(itemmining.get_relim_input(ts1), 40)
+        chunks = lambda: (ts1[i:i + 60] for i in range(0, len(ts1), 60))
+        for algorithm in ('relim', 'fpgrowth'):
+            (report, total) = itemmining.son(chunks, 0.2, algorithm)
+            self.assertEqual(200, total)
+            self.assertEqual(expected, report)
+        self.assertRaises(ValueError, itemmining.son, chunks, 40)
+
+        # The last chunk, a single wide transaction, is mined with the
+        # previous one instead of at a support of 1.
+        ts2 = [random.sample(range(25), 20) for _ in range(133)]
+        expected = itemmining.relim(itemmining.get_relim_input(ts2),
+                0.5 * 133)
+        chunks = lambda: (ts2[i:i + 66] for i in range(0, len(ts2), 66))
+        self.assertEqual((expected, 133), itemmining.son(chunks, 0.5))
@@ -0,0 +1,57 @@
+import unittest
+from pymining import itemmining, perftesting, assocrules
+
+try:
+    from pymining import ruletable
+except ImportError:
+    ruletable = None
+
+
+@unittest.skipIf(ruletable is None, 'NumPy is not installed')
+class TestRuleTable(unittest.TestCase):
+
+    def setUp(self):
+        ts1 = perftesting.get_default_transactions()
+        self.total = len(ts1)
+        self.report = itemmining.relim(itemmining.get_relim_input(ts1), 2)
+        self.table = ruletable.mine_rule_table(self.report, self.total)
+
+    def test_filter(self):
+        rules = assocrules.mine_assoc_rules(self.report, self.total,
+                min_confidence=0.75, min_lift=1.0)
+        table = self.table.filter(min_confidence=0.75, min_lift=1.0)
+        self.assertEqual(len(rules), len(table))
+        self.assertEqual(set(rules), set(table))
+
+    def test_metrics(self):
+        for (i, (left, right, support, confidence)) in enumerate(self.table):
+            left_support = float(self.report[left]) / self.total
+            right_support = float(self.report[right]) / self.total
+            self.assertAlmostEqual(float(support) / self.report[left],
+                    confidence)
+            self.assertAlmostEqual(confidence / right_support,
+                    self.table.lift[i])
+            self.assertAlmostEqual(float(support) / self.total -
+                    left_support * right_support, self.table.leverage[i])
+            if confidence < 1.0:
+                self.assertAlmostEqual((1 - right_support) /
+                        (1 - confidence), self.table.conviction[i])
+
+    def test_sort_top(self):
+        lifts = list(self.table.sort('lift').lift)
+        self.assertEqual(sorted(lifts, reverse=True), lifts)
+        top = self.table.top(3, 'confidence')
+        self.assertEqual(sorted(self.table.confidence, reverse=True)[:3],
+                list(top.confidence))
+        self.assertRaises(ValueError, self.table.sort, 'size')
+        self.assertRaises(ValueError, self.table.top, 0)
+        self.assertRaises(ValueError, self.table.top, 2.5)
+        self.assertEqual(len(self.table), len(self.table.top(
+            len(self.table) + 1)))
+
+    def test_contains(self):
+        table = self.table.contains(left=['b'], right=['d'])
+        expected = [rule for rule in self.table
+                if 'b' in rule[0] and 'd' in rule[1]]
+        self.assertEqual(expected, list(table))
+        self.assertEqual(0, len(self.table.contains(left=['z'])))
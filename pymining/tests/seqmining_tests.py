@@ -0,0 +1,179 @@
+import unittest
+from pymining import seqmining, perftesting
+
+
+class TestSeqAlgo(unittest.TestCase):
+
+    def test_freq_seq_enum(self):
+        seqs = perftesting.get_default_sequences()
+        freq_seqs = seqmining.freq_seq_enum(seqs, 2)
+        self.assertEqual(17, len(freq_seqs))
+        self.assertTrue((('a', 'b', 'c'), 4) in freq_seqs)
+
+    def test_constraints(self):
+        seqs = perftesting.get_default_sequences()
+        freq_seqs = seqmining.freq_seq_enum(seqs, 2)
+
+        constrained = seqmining.freq_seq_enum(seqs, 2, required=['a', 'b'],
+                excluded=['c'], max_length=3)
+        expected = {(seq, support) for (seq, support) in freq_seqs
+                if 'a' in seq and 'b' in seq and 'c' not in seq and
+                len(seq) <= 3}
+        self.assertEqual(expected, constrained)
+
+    def test_pseudo(self):
+        seqs = perftesting.get_default_sequences()
+        self.assertEqual(seqmining.freq_seq_enum(seqs, 2),
+                seqmining.freq_seq_enum(seqs, 2, pseudo=True))
+        self.assertEqual(
+                seqmining.freq_seq_enum(seqs, 2, required=['b'],
+                    max_length=2),
+                seqmining.freq_seq_enum(seqs, 2, required=['b'],
+                    max_length=2, pseudo=True))
+
+        ts = perftesting.get_random_transactions(transaction_number=50,
+                max_item_per_transaction=8, universe_size=10,
+                key_alphabet=None)
+        seqs = [sorted(t, key=lambda x: (x * 7) % 10) for t in ts]
+        self.assertEqual(seqmining.freq_seq_enum(seqs, 5),
+                seqmining.freq_seq_enum(seqs, 5, pseudo=True))
+
+    def test_bitmap(self):
+        seqs = perftesting.get_default_sequences()
+        self.assertEqual(seqmining.freq_seq_enum(seqs, 2),
+                seqmining.freq_seq_bitmap(seqs, 2))
+        self.assertEqual(
+                seqmining.freq_seq_enum(seqs, 2, required=['b'],
+                    excluded=['a'], max_length=2),
+                seqmining.freq_seq_bitmap(seqs, 2, required=['b'],
+                    excluded=['a'], max_length=2))
+
+        ts = perftesting.get_random_transactions(transaction_number=50,
+                max_item_per_transaction=8, universe_size=10,
+                key_alphabet=None)
+        seqs = [sorted(t, key=lambda x: (x * 7) % 10) for t in ts]
+        seqs.append([])
+        seqs.append([1, 1, 2, 1, 2, 2])
+        for min_support in (1, 5):
+            self.assertEqual(seqmining.freq_seq_enum(seqs, min_support),
+                    seqmining.freq_seq_bitmap(seqs, min_support))
+
+    def test_closed(self):
+        seqs = perftesting.get_default_sequences()
+        closed = seqmining.freq_seq_enum(seqs, 2, closed=True)
+        self.assertEqual(6, len(closed))
+        self.assertTrue((('a', 'b', 'c'), 4) in closed)
+        self.assertTrue((('c', 'a', 'b', 'c'), 2) in closed)
+
+        def is_subsequence(seq1, seq2):
+            items = iter(seq2)
+            return all(item in items for item in seq1)
+
+        ts = perftesting.get_random_transactions(transaction_number=40,
+                max_item_per_transaction=6, universe_size=8,
+                key_alphabet=None)
+        seqs = [sorted(t, key=lambda x: (x * 3) % 8) + sorted(t)[:2]
+                for t in ts]
+        freq_seqs = seqmining.freq_seq_enum(seqs, 4)
+        expected = set((seq, support) for (seq, support) in freq_seqs
+                if not any(support == support2 and len(seq2) > len(seq) and
+                    is_subsequence(seq, seq2)
+                    for (seq2, support2) in freq_seqs))
+        self.assertEqual(expected, seqmining.freq_seq_enum(seqs, 4,
+            closed=True))
+        self.assertRaises(ValueError, seqmining.freq_seq_enum, seqs, 4,
+                max_length=2, closed=True)
+
+    def test_lifts(self):
+        seqs = perftesting.get_default_sequences()
+        lifts = dict((seq, (support, lift)) for (seq, support, lift)
+                in seqmining.get_lifts(seqs, seqmining.freq_seq_enum(seqs, 2)))
+        # c then a is in 3 of the 4 sequences, c and a are in all of them.
+        self.assertEqual((0.75, 0.75), lifts[('c', 'a')])
+        # Its parts are a and b-b, or b and a.
+        self.assertEqual((0.5, 0.5), lifts[('a', 'b', 'b')])
+        self.assertFalse(('a',) in lifts)
+
+        # The closed sequences get the same supports and lifts.
+        ts = perftesting.get_random_transactions(transaction_number=40,
+                max_item_per_transaction=6, universe_size=8,
+                key_alphabet=None)
+        seqs = [sorted(t, key=lambda x: (x * 3) % 8) + sorted(t)[:2]
+                for t in ts]
+        closed = seqmining.get_lifts(seqs, seqmining.freq_seq_enum(seqs, 4,
+            closed=True))
+        lifts = dict((seq, (support, lift)) for (seq, support, lift)
+                in seqmining.get_lifts(seqs, seqmining.freq_seq_enum(seqs, 4)))
+        self.assertTrue(len(closed) > 0)
+        for (seq, support, lift) in closed:
+            self.assertEqual(lifts[seq], (support, lift))
+
+    def test_parallel(self):
+        ts = perftesting.get_random_transactions(transaction_number=60,
+                max_item_per_transaction=8, universe_size=10,
+                key_alphabet=None)
+        seqs = [sorted(t, key=lambda x: (x * 7) % 10) for t in ts]
+        for options in ({}, {'pseudo': True}, {'closed': True},
+                {'required': [1], 'max_length': 3}):
+            self.assertEqual(seqmining.freq_seq_enum(seqs, 5, **options),
+                    seqmining.freq_seq_enum(seqs, 5, workers=2, **options))
+        (freq_seqs, stats) = seqmining.freq_seq_enum(seqs, 5, stats=True,
+                workers=2)
+        (_, serial_stats) = seqmining.freq_seq_enum(seqs, 5, stats=True)
+        self.assertEqual(serial_stats.calls, stats.calls)
+        self.assertEqual(serial_stats.nodes, stats.nodes)
+        self.assertEqual(len(serial_stats.item_times), len(stats.item_times))
+
+    def test_time_constraints(self):
+        seqs = [['a', 'b', 'c'], ['a', 'c', 'b'], ['a', 'b', 'x', 'c']]
+        times = [[0, 5, 20], [0, 10, 15], [0, 5, 8, 10]]
+        freq_seqs = seqmining.freq_seq_enum(seqs, 2, times=times,
+                max_window=12)
+        self.assertTrue((('a', 'b'), 2) in freq_seqs)
+        self.assertTrue((('a', 'c'), 2) in freq_seqs)
+        self.assertFalse(any(seq == ('a', 'b', 'c') for (seq, _) in
+            freq_seqs))
+
+        # a, b and c are 5 apart in the third sequence, a and c are not.
+        freq_seqs = seqmining.freq_seq_enum(seqs, 1, times=times, max_gap=5,
+                excluded=['x'])
+        self.assertTrue((('a', 'b', 'c'), 1) in freq_seqs)
+        self.assertFalse(any(seq == ('a', 'c') for (seq, _) in freq_seqs))
+        self.assertEqual(freq_seqs, seqmining.freq_seq_enum(seqs, 1,
+            times=times, max_gap=5, excluded=['x'], workers=2))
+
+        # Without times, the gap is counted in positions.
+        freq_seqs = seqmining.freq_seq_enum(seqs, 1, max_gap=1)
+        self.assertTrue((('a', 'b', 'x', 'c'), 1) in freq_seqs)
+        self.assertFalse(any(seq == ('a', 'x') for (seq, _) in freq_seqs))
+        self.assertEqual(seqmining.freq_seq_enum(seqs, 2),
+                seqmining.freq_seq_enum(seqs, 2, times=times,
+                    max_window=20))
+        self.assertRaises(ValueError, seqmining.freq_seq_enum, seqs, 2,
+                max_gap=1, closed=True)
+
+        # The parts of a-b-c are counted within the window too: b-c only
+        # fits in the third sequence, a-b and a-c in two of them.
+        [(_, support, lift)] = seqmining.get_lifts(seqs,
+                [(('a', 'b', 'c'), 1)], times=times, max_window=12)
+        self.assertAlmostEqual(1.0 / 3, support)
+        self.assertAlmostEqual(0.5, lift)
+        # Counted parts have the supports the mining gives them.
+        freq_seqs = seqmining.freq_seq_enum(seqs, 1, times=times,
+                max_window=12)
+        lifts = dict((seq, (support, lift)) for (seq, support, lift)
+                in seqmining.get_lifts(seqs, freq_seqs, times=times,
+                    max_window=12))
+        longest = [(seq, support) for (seq, support) in freq_seqs
+                if len(seq) > 2]
+        for (seq, support, lift) in seqmining.get_lifts(seqs, longest,
+                times=times, max_window=12):
+            self.assertEqual(lifts[seq], (support, lift))
+
+    def test_stats(self):
+        seqs = perftesting.get_default_sequences()
+        (freq_seqs, stats) = seqmining.freq_seq_enum(seqs, 2, stats=True)
+        self.assertEqual(seqmining.freq_seq_enum(seqs, 2), freq_seqs)
+        self.assertEqual(len(freq_seqs) + 1, stats.calls)
+        self.assertEqual(len(freq_seqs), stats.databases)
+        self.assertEqual(3, len(stats.item_times))
@@ -43,6 +43,10 @@ class RMDB:
     self.c = self.conn.cursor()
     self.curriculum = []
     self.meta_id_map = {}
+    # token indexes are handed out as tokens show up and never change, so the
+    # baskets of every query share them.
+    self.token_to_idx = {}
+    self.idx_to_token = {}
     self.c.execute('''select * from objectives order by obj_idx''')
     # compose objectives
     objs = self.c.fetchall()
@@ -103,22 +107,23 @@ class RMDB:
     '''Generate a set token for the given transaction'''
     return transaction[2], attempt, transaction[6] == 'YES', transaction[7] == 'YES'
 
-  def query(self, max_metaids = -1):
+  def query(self, max_metaids = -1, by_user = False, timed = False):
     '''Query the db by my selection.
     
     Returns a list of frozensets, and sets internal representations to translate
-    them back to graph structure.'''
+    them back to graph structure.
 
-    meta_ids = []
-    count = 0
+    If by_user is set, returns a dict of user_id to basket of tokens instead.
+    Tokens are stable across queries, unlike their indexes, so these baskets
+    can feed an itemmining.IncrementalFPGrowth day after day.
 
-    for obj in self.curriculum:
-      for module in obj.modules:
-        if obj.selected or module.selected:
-          meta_ids.extend(module.meta_ids)
+    If timed is set, the tokens of each basket are in the order of their start
+    times, and the start times are returned too: (baskets, times), or a dict of
+    user_id to (basket, times) with by_user. These feed the time constraints of
+    seqmining.freq_seq_enum.'''
 
-    if max_metaids > 0:
-      meta_ids = meta_ids[:max_metaids]
+    meta_ids = self.selected_meta_ids(max_metaids)
+    count = 0
 
     q_str = '''SELECT * FROM transactions WHERE meta_id IN ({seq}) order by 
       user_id, meta_id, start'''.format(seq=','.join(['?']*len(meta_ids)))
@@ -130,6 +135,8 @@ class RMDB:
     attempt = 0
 
     baskets = []
+    starts = []
+    user_ids = []
     tokens = set([])
 
     # scan through the output, creating tokens for the output and mappings for
@@ -142,6 +149,8 @@ class RMDB:
         meta_id = None
         attempt = 0
         baskets.append([])
+        starts.append([])
+        user_ids.append(user_id)
 
       # new question (reset attempt)
       if not transaction[2] == meta_id:
@@ -153,23 +162,100 @@ class RMDB:
 
       token = self.token(transaction, attempt)
       baskets[-1].append(token)
+      starts[-1].append(transaction[4])
       tokens.add(token)
       attempt += 1
 
+    times = None
+    if timed:
+      # rows come by meta_id within a user, put them back in time order.
+      for idx in range(len(baskets)):
+        order = sorted(range(len(baskets[idx])), key = starts[idx].__getitem__)
+        baskets[idx] = [baskets[idx][i] for i in order]
+        starts[idx] = [starts[idx][i] for i in order]
+      times = starts
+
     print "{} baskets".format(len(baskets))
     print "{} unique tokens".format(len(tokens))
 
     lens = [len(x) for x in baskets]
     print "{} longest sequence".format(max([len(x) for x in baskets]))
 
-    self.token_to_idx = {x[1]:x[0] for x in enumerate(tokens)}
-    self.idx_to_token = {x[0]:x[1] for x in enumerate(tokens)}
+    if by_user:
+      if timed:
+        return dict(zip(user_ids, zip(baskets, times)))
+      return dict(zip(user_ids, baskets))
 
     # shorten strings to integers to make comparisons faster.
-    baskets_short = [[self.token_to_idx[token] for token in transaction] for transaction in baskets]
+    baskets_short = [[self.token_index(token) for token in transaction] for transaction in baskets]
  
+    if timed:
+      return baskets_short, times
     return baskets_short
 
+  def selected_meta_ids(self, max_metaids = -1):
+    meta_ids = []
+    for obj in self.curriculum:
+      for module in obj.modules:
+        if obj.selected or module.selected:
+          meta_ids.extend(module.meta_ids)
+
+    if max_metaids > 0:
+      meta_ids = meta_ids[:max_metaids]
+    return meta_ids
+
+  def query_chunks(self, chunk_size = 10000, max_metaids = -1):
+    '''Stream the baskets of my selection, chunk_size users at a time.
+
+    Unlike query, the rows are never all in memory. The chunks of several
+    passes, and the baskets of query, share the same token indexes. Feeds
+    itemmining.son.'''
+    meta_ids = self.selected_meta_ids(max_metaids)
+
+    q_str = '''SELECT * FROM transactions WHERE meta_id IN ({seq}) order by 
+      user_id, meta_id, start'''.format(seq=','.join(['?']*len(meta_ids)))
+    # a cursor of our own, so that the caller may query between chunks.
+    c = self.conn.cursor()
+    c.execute(q_str, meta_ids)
+
+    user_id = None
+    meta_id = None
+    attempt = 0
+    chunk = []
+    for transaction in c:
+      # new user (new basket)
+      if not transaction[0] == user_id:
+        if len(chunk) == chunk_size:
+          yield chunk
+          chunk = []
+        user_id = transaction[0]
+        meta_id = None
+        attempt = 0
+        chunk.append([])
+
+      # new question (reset attempt)
+      if not transaction[2] == meta_id:
+        meta_id = transaction[2]
+        attempt = 0
+
+      if attempt > 1:
+        continue
+
+      token = self.token(transaction, attempt)
+      chunk[-1].append(self.token_index(token))
+      attempt += 1
+
+    if chunk:
+      yield chunk
+
+  def token_index(self, token):
+    '''The index of token, a new one the first time it shows up.'''
+    if token not in self.token_to_idx:
+      idx = len(self.token_to_idx)
+      self.token_to_idx[token] = idx
+      self.idx_to_token[idx] = token
+    return self.token_to_idx[token]
+
   def select(self, obj_idxs = None, module_id = None):
     if obj_idxs:
       for obj in self.curriculum: